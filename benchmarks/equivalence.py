@@ -0,0 +1,134 @@
+# benchmarks/equivalence.py
+"""
+Checks that the batched cleaners give exactly the same output as the
+per-value reference functions (and likely_domain_mask the same answers as
+_is_likely_domain).
+
+    python -m benchmarks.equivalence                  # 100k rows, seeds 0-2
+    python -m benchmarks.equivalence --save-digests   # after an intended rule change
+
+clean_company_name and clean_domain are the references. Every batched
+engine (clean_company_names, clean_company_domains and any later one) must
+match them value for value on synthetic TALs. A digest of the reference
+output is also kept in benchmarks/baseline.json, so a change to the
+references themselves shows up too. detect_type_by_content, which stops
+early on a sample, must also give the type a full scan gives, including on
+columns sorted names-first or domains-first. Exits with 1 on any difference.
+"""
+import argparse
+import hashlib
+import sys
+
+import pandas as pd
+
+from benchmarks.generate import company_domains, company_names
+from benchmarks.run import BASELINE_PATH, load_baseline, save_baseline
+
+
+def _engines():
+    """kind -> (values(n_rows, seed), reference per value, {engine name: batched function})."""
+    from cleaner.clean_domains import clean_company_domains, clean_domain
+    from cleaner.clean_names import clean_company_name, clean_company_names
+    from cleaner.utils import ARROW_STRING, _is_likely_domain, likely_domain_mask
+    return {
+        'name': (company_names, clean_company_name, {
+            'clean_company_names': clean_company_names,
+            'clean_company_names/arrow': lambda values: clean_company_names(values.astype(ARROW_STRING)),
+        }),
+        'domain': (company_domains, clean_domain, {
+            'clean_company_domains': clean_company_domains,
+            'clean_company_domains/arrow': lambda values: clean_company_domains(values.astype(ARROW_STRING)),
+        }),
+        'likely_domain': (company_domains, _is_likely_domain, {
+            'likely_domain_mask': lambda values: pd.Series(likely_domain_mask(values)),
+            'likely_domain_mask/arrow': lambda values: pd.Series(likely_domain_mask(values.astype(ARROW_STRING))),
+        }),
+    }
+
+
+def _same(a, b) -> bool:
+    return (pd.isna(a) and pd.isna(b)) or (not pd.isna(a) and not pd.isna(b) and a == b)
+
+
+def digest(values) -> str:
+    h = hashlib.sha256()
+    for value in values:
+        h.update(b'\x00NA' if pd.isna(value) else str(value).encode('utf-8'))
+        h.update(b'\x01')
+    return h.hexdigest()[:16]
+
+
+def check(n_rows: int, seeds, stored: dict, max_examples: int = 5):
+    """Returns (failures, digests) over all kinds, engines and seeds."""
+    failures, digests = [], {}
+    for kind, (make_values, reference, engines) in _engines().items():
+        for seed in seeds:
+            values = make_values(n_rows, seed=seed, unique_ratio=0.5)
+            expected = values.map(reference).tolist()
+            key = f'{kind}@{n_rows}/seed{seed}'
+            digests[key] = digest(expected)
+            if key in stored and stored[key] != digests[key]:
+                failures.append(f"{key}: reference output changed (digest {digests[key]}, stored {stored[key]})")
+
+            for engine_name, engine in engines.items():
+                actual = engine(values).tolist()
+                diffs = [i for i, (a, b) in enumerate(zip(expected, actual)) if not _same(a, b)]
+                if len(actual) != len(expected):
+                    failures.append(f"{engine_name} {key}: {len(actual)} values for {len(expected)} inputs")
+                elif diffs:
+                    examples = '; '.join(f"{values.iloc[i]!r}: {actual[i]!r} != {expected[i]!r}"
+                                         for i in diffs[:max_examples])
+                    failures.append(f"{engine_name} {key}: {len(diffs)} differences, e.g. {examples}")
+                else:
+                    print(f"ok  {engine_name:<28} {key}")
+    return failures, digests
+
+
+def check_detection(n_rows: int, seeds):
+    """Returns failures where early-stopping detection disagrees with a full scan of a sorted column."""
+    from cleaner.detect import detect_type_by_content
+    from cleaner.utils import _is_likely_domain
+    failures = []
+    for seed in seeds:
+        names = company_names(n_rows, seed=seed, unique_ratio=0.5)
+        domains = company_domains(n_rows, seed=seed, unique_ratio=0.5)
+        for share in (0.3, 0.45, 0.55, 0.7):
+            cut = int(n_rows * share)
+            for order, parts in (('names first', (names[:cut], domains[cut:])),
+                                 ('domains first', (domains[cut:], names[:cut]))):
+                values = pd.concat(parts, ignore_index=True)
+                present = values.dropna()
+                expected = 'domain' if present.map(_is_likely_domain).mean() >= 0.5 else 'name'
+                actual = detect_type_by_content(values)
+                key = f"detect@{n_rows}/seed{seed} {share:.0%} names, {order}"
+                if actual != expected:
+                    failures.append(f"{key}: {actual!r} != {expected!r}")
+                else:
+                    print(f"ok  {'detect_type_by_content':<28} {key}")
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Compare the batched cleaners with the per-value references.')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--seeds', default='0,1,2', help='comma-separated generator seeds')
+    parser.add_argument('--save-digests', action='store_true',
+                        help='store the reference digests in the baseline file')
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline()
+    seeds = [int(seed) for seed in args.seeds.split(',')]
+    failures, digests = check(args.rows, seeds, {} if args.save_digests else baseline.get('equivalence', {}))
+    failures += check_detection(args.rows, seeds)
+    for message in failures:
+        print(f"MISMATCH {message}")
+
+    if args.save_digests and not failures:
+        baseline.setdefault('equivalence', {}).update(digests)
+        save_baseline(baseline)
+        print(f"Reference digests saved to {BASELINE_PATH}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
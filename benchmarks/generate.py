@@ -0,0 +1,177 @@
+# benchmarks/generate.py
+"""
+Deterministic synthetic TALs for benchmarks and equivalence checks.
+
+    python -m benchmarks.generate out_folder --rows 100000
+
+The same seed always gives the same data. Values are drawn from a pool of
+distinct companies with a skewed distribution, so there are many duplicates,
+like real TALs. Names carry legal suffixes, parentheticals, dash separators
+and casing or whitespace noise. URLs carry schemes, www prefixes,
+subdomains, multi-part TLDs, paths and queries. Some of both are non-ASCII
+(Turkish İ, German ß, IDNs), whose case rules differ between Python and
+pyarrow. A few header-like placeholders and blanks are mixed in.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+WORDS = [
+    'Acme', 'Global', 'Blue', 'River', 'Nova', 'Apex', 'Summit', 'Pioneer', 'Quantum', 'Silver',
+    'Northern', 'Atlas', 'Vertex', 'Harbor', 'Evergreen', 'Falcon', 'Crescent', 'Orion', 'Granite',
+    'Maple', 'Redwood', 'Sterling', 'Horizon', 'Beacon', 'Cobalt', 'Delta', 'Ember', 'Fusion',
+]
+SECTORS = [
+    'Tech', 'Foods', 'Logistics', 'Energy', 'Health', 'Capital', 'Media', 'Labs', 'Networks',
+    'Retail', 'Pharma', 'Analytics', 'Robotics', 'Foods & Beverage', 'Mining', 'Telecom',
+]
+LEGAL_SUFFIXES = [
+    ' Inc', ' Inc.', ', Inc.', ' LLC', ' Ltd', ' Ltd.', ' Corp', ' Corporation', ' GmbH', ' AG',
+    ' PLC', ' S.A.', ' SA de CV', ' Holdings Inc', ' Group', ' Co', ' & Co', ' Solutions LLC', ' BV',
+]
+DECORATIONS = [' (US)', ' (Europe)', ' - EMEA', ' – Global HQ', ' UK', ' DE']
+SPECIAL_NAMES = ['jpmorgan chase & co', 'HP INC.', 'ibm corp', "macy's inc", 'The Coca-Cola Company',
+                 'The Boston Consulting Group']
+# Names whose case rules differ between Python and pyarrow (Turkish İ, German ß, ...).
+NON_ASCII_NAMES = ['DENİZBANK A.Ş.', 'ßAUER GmbH', 'Müller Bäckerei GmbH', 'İŞ BANKASI', 'Straße & Söhne KG',
+                   'Société Générale SA', 'ŁÓDŹ Logistics Sp. z o.o.', 'ǅemal Trading', 'ﬁnance ﬂow Ltd']
+# Host labels whose case rules differ between Python and pyarrow, and IDNs.
+NON_ASCII_LABELS = ['İbm', 'DENİZBANK', 'straße', 'STRASSE', 'münchen', 'bücher', 'ŁÓDŹ', 'ǅemal', 'ﬁnance',
+                    'société', 'xn--mnchen-3ya', 'пример', '例え']
+TLDS = ['com', 'com', 'com', 'net', 'org', 'io', 'de', 'fr', 'co.uk', 'org.uk', 'com.au', 'co.jp',
+        'com.br', 'com.mx', 'co.za', 'com.sg', 'ac.uk', 'gov.au', 'co.in', 'ck', 'xyz']
+SCHEMES = ['', '', 'http://', 'https://', 'HTTPS://']
+HOST_PREFIXES = ['', '', 'www.', 'www2.', 'shop.', 'en.', 'mail.']
+PATHS = ['', '', '', '/', '/about', '/en/contact?ref=tal', '/products/#top', '?utm_source=x']
+PLACEHOLDERS = {'name': ['Company', 'Account Name', 'N/A', ''], 'domain': ['Website', 'URL', 'n/a', '']}
+
+TARGET_HEADERS = {'name': 'Account Name', 'domain': 'Website'}
+
+
+def _pick(rng, options, size):
+    return np.asarray(options, dtype=object)[rng.integers(0, len(options), size)]
+
+
+def _skewed_indices(rng, n_rows, pool_size, skew):
+    """Row -> pool entry, with low entries far more common (skew > 1)."""
+    return np.minimum((pool_size * rng.random(n_rows) ** skew).astype(np.int64), pool_size - 1)
+
+
+def _company_pool(rng, pool_size):
+    """Distinct base company names, e.g. 'Nova Analytics 17'."""
+    first = _pick(rng, WORDS, pool_size)
+    second = _pick(rng, SECTORS, pool_size)
+    numbers = np.arange(pool_size).astype(str)
+    return first + ' ' + second + ' ' + numbers
+
+
+def _add_casing_noise(rng, values):
+    values = values.copy()
+    style = rng.integers(0, 10, len(values))
+    upper, lower, spaced = style == 0, style == 1, style == 2
+    values[upper] = pd.Series(values[upper], dtype=object).str.upper().to_numpy()
+    values[lower] = pd.Series(values[lower], dtype=object).str.lower().to_numpy()
+    values[spaced] = '  ' + pd.Series(values[spaced], dtype=object).str.replace(' ', '   ').to_numpy() + ' '
+    return values
+
+
+def _with_placeholders(rng, values, kind, ratio=0.01):
+    values = values.copy()
+    n_placeholders = int(len(values) * ratio)
+    positions = rng.choice(len(values), size=n_placeholders, replace=False)
+    values[positions] = _pick(rng, PLACEHOLDERS[kind] + [None], n_placeholders)
+    return values
+
+
+def company_names(n_rows: int, seed: int = 0, unique_ratio: float = 0.1, skew: float = 2.0) -> pd.Series:
+    """`n_rows` noisy company names drawn from about n_rows * unique_ratio companies."""
+    rng = np.random.default_rng(seed)
+    pool_size = max(int(n_rows * unique_ratio), 1)
+    pool = _company_pool(rng, pool_size)
+
+    # Every company gets a fixed legal form, some a decoration too.
+    pool = pool + np.where(rng.random(pool_size) < 0.7, _pick(rng, LEGAL_SUFFIXES, pool_size), '')
+    pool = pool + np.where(rng.random(pool_size) < 0.15, _pick(rng, DECORATIONS, pool_size), '')
+    special = rng.random(pool_size) < 0.02
+    pool[special] = _pick(rng, SPECIAL_NAMES, int(special.sum()))
+    the_form = rng.random(pool_size) < 0.03
+    pool[the_form] = 'The ' + pool[the_form] + ' Company'
+    non_ascii = rng.random(pool_size) < 0.03
+    pool[non_ascii] = _pick(rng, NON_ASCII_NAMES, int(non_ascii.sum())) + ' ' + pool[non_ascii]
+
+    values = _add_casing_noise(rng, pool[_skewed_indices(rng, n_rows, pool_size, skew)])
+    return pd.Series(_with_placeholders(rng, values, 'name'), dtype=object, name=TARGET_HEADERS['name'])
+
+
+def company_domains(n_rows: int, seed: int = 0, unique_ratio: float = 0.1, skew: float = 2.0) -> pd.Series:
+    """`n_rows` noisy URLs and domains drawn from about n_rows * unique_ratio sites."""
+    rng = np.random.default_rng(seed)
+    pool_size = max(int(n_rows * unique_ratio), 1)
+    labels = pd.Series(_company_pool(rng, pool_size), dtype=object).str.replace(' ', '').str.lower().to_numpy(copy=True)
+    non_ascii = rng.random(pool_size) < 0.03
+    labels[non_ascii] = _pick(rng, NON_ASCII_LABELS, int(non_ascii.sum())) + '-' + labels[non_ascii]
+    hosts = labels + '.' + _pick(rng, TLDS, pool_size)
+
+    rows = _skewed_indices(rng, n_rows, pool_size, skew)
+    values = (_pick(rng, SCHEMES, n_rows) + _pick(rng, HOST_PREFIXES, n_rows) + hosts[rows]
+              + _pick(rng, PATHS, n_rows))
+    upper = rng.random(n_rows) < 0.05
+    values[upper] = pd.Series(values[upper], dtype=object).str.upper().to_numpy()
+    invalid = rng.random(n_rows) < 0.005
+    values[invalid] = labels[rows[invalid]]
+    return pd.Series(_with_placeholders(rng, values, 'domain'), dtype=object, name=TARGET_HEADERS['domain'])
+
+
+def make_tal(n_rows: int, kind: str = 'name', width: int = 3, seed: int = 0, **distribution) -> pd.DataFrame:
+    """
+    A TAL frame with a target column of `kind` ('name' or 'domain') and
+    width - 1 filler columns. A wide export uses a large width.
+    """
+    make = company_names if kind == 'name' else company_domains
+    rng = np.random.default_rng(seed + 1)
+    columns = {'Id': np.arange(n_rows)}
+    for i in range(max(width - 2, 0)):
+        columns[f'Field {i}'] = rng.integers(0, 1000, n_rows)
+    frame = pd.DataFrame(columns)
+    frame.insert(min(1, width - 1), TARGET_HEADERS[kind], make(n_rows, seed=seed, **distribution).to_numpy())
+    return frame.iloc[:, :width]
+
+
+def write_tal(path: str, n_rows: int, kind: str = 'name', width: int = 3, seed: int = 0, **distribution) -> str:
+    """Writes make_tal() as .csv or .xlsx, depending on the extension of `path`."""
+    frame = make_tal(n_rows, kind, width, seed, **distribution)
+    if path.endswith('.xlsx'):
+        if n_rows >= 1_048_576:
+            raise ValueError("Excel sheets hold at most 1,048,575 data rows")
+        frame.to_excel(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+    return path
+
+
+def write_tal_folder(folder: str, n_rows: int, seed: int = 0, xlsx: bool = True) -> list:
+    """
+    A folder with the usual shapes: a tall names CSV, a wide domains CSV and,
+    while it fits in a sheet, a names workbook. Returns the file paths.
+    """
+    os.makedirs(folder, exist_ok=True)
+    paths = [
+        write_tal(os.path.join(folder, 'tall_names.csv'), n_rows, 'name', width=3, seed=seed),
+        write_tal(os.path.join(folder, 'wide_domains.csv'), n_rows, 'domain', width=60, seed=seed + 1),
+    ]
+    if xlsx and n_rows < 1_048_576:
+        paths.append(write_tal(os.path.join(folder, 'names.xlsx'), n_rows, 'name', width=3, seed=seed + 2))
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write a folder of synthetic TALs.')
+    parser.add_argument('folder')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-xlsx', action='store_true', help='skip the workbook (slow to write)')
+    args = parser.parse_args()
+    for path in write_tal_folder(args.folder, args.rows, args.seed, xlsx=not args.no_xlsx):
+        print(path)
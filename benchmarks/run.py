@@ -0,0 +1,278 @@
+# benchmarks/run.py
+"""
+Throughput and memory benchmarks for the cleaning stages.
+
+    python -m benchmarks.run                       # 10k and 100k rows, compare to baseline
+    python -m benchmarks.run --scales 10k,1m,10m --stages clean_company_domains
+    python -m benchmarks.run --save-baseline       # record this machine's numbers
+    python -m benchmarks.run --arrow-strings       # the same with Arrow-backed strings
+
+Each stage runs on synthetic TALs from benchmarks.generate at every scale.
+It is timed once, then run again under tracemalloc to get its peak memory
+(--no-memory skips that second run). The timed run also records how far the
+process's resident memory (RSS) rose above where it started, where the OS
+lets the peak be reset (Linux). Results are compared with
+benchmarks/baseline.json. The exit status is 1 if a stage's rows/sec drops
+or its peak memory grows by more than --tolerance. Baselines depend on the
+machine, so record one on the machine that runs the comparison.
+With --arrow-strings, values are ARROW_STRING series and bulk runs use
+CleanOptions(arrow_strings=True); results are kept under '<key>/arrow'.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generate import company_domains, company_names, make_tal, write_tal_folder
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_SCALES = '10k,100k'
+DEFAULT_TOLERANCE = 0.3
+
+
+def _strings(values, arrow_strings):
+    """The generated values, as Arrow-backed strings if asked for."""
+    from cleaner.utils import ARROW_STRING
+    return values.astype(ARROW_STRING) if arrow_strings else values
+
+
+def _stage_is_likely_domain(n_rows, arrow_strings):
+    from cleaner.utils import likely_domain_mask
+    values = _strings(company_domains(n_rows), arrow_strings)
+    return lambda: likely_domain_mask(values)
+
+
+def _stage_clean_company_name(n_rows, arrow_strings):
+    from cleaner.clean_names import clean_company_name
+    values = company_names(n_rows)
+    return lambda: values.map(clean_company_name)
+
+
+def _stage_clean_company_names(n_rows, arrow_strings):
+    from cleaner.clean_names import clean_company_names
+    values = _strings(company_names(n_rows), arrow_strings)
+    return lambda: clean_company_names(values)
+
+
+def _stage_clean_domain(n_rows, arrow_strings):
+    from cleaner.clean_domains import clean_domain
+    values = company_domains(n_rows)
+    return lambda: values.map(clean_domain)
+
+
+def _stage_clean_company_domains(n_rows, arrow_strings):
+    from cleaner.clean_domains import clean_company_domains
+    values = _strings(company_domains(n_rows), arrow_strings)
+    return lambda: clean_company_domains(values)
+
+
+def _stage_dedup(n_rows, arrow_strings):
+    from cleaner.clean_names import clean_company_names
+    from processor import _first_occurrence_mask
+    cleaned = clean_company_names(_strings(company_names(n_rows), arrow_strings))
+    return lambda: _first_occurrence_mask(cleaned)
+
+
+def _stage_find_target_column_and_type(n_rows, arrow_strings):
+    from cleaner.detect import find_target_column_and_type
+    # A wide export without recognisable headers forces the content fallback.
+    frame = make_tal(n_rows, 'domain', width=200)
+    frame.columns = [f'c{i}' for i in range(frame.shape[1])]
+    return lambda: find_target_column_and_type(frame)
+
+
+def _stage_process_folder(n_rows, arrow_strings):
+    import processor
+    folder = tempfile.mkdtemp(prefix='tal_bench_')
+    write_tal_folder(folder, n_rows, xlsx=n_rows <= 100_000)
+    options = processor.CleanOptions(arrow_strings=arrow_strings)
+
+    def run():
+        shutil.rmtree(os.path.join(folder, 'clean_companies'), ignore_errors=True)
+        processor.process_folder(folder, True, options=options)
+    run.cleanup = lambda: shutil.rmtree(folder, ignore_errors=True)
+    return run
+
+
+# name -> setup(n_rows, arrow_strings) returning the function to measure
+STAGES = {
+    'is_likely_domain': _stage_is_likely_domain,
+    'clean_company_name': _stage_clean_company_name,
+    'clean_company_names': _stage_clean_company_names,
+    'clean_domain': _stage_clean_domain,
+    'clean_company_domains': _stage_clean_company_domains,
+    'dedup': _stage_dedup,
+    'find_target_column_and_type': _stage_find_target_column_and_type,
+    'process_folder': _stage_process_folder,
+}
+
+
+def parse_scale(text: str) -> int:
+    """'10k' -> 10000, '1m' -> 1000000."""
+    text = text.strip().lower()
+    factor = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * factor)
+
+
+def _quiet(func):
+    """Runs func with its prints suppressed."""
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        return func()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def _rss_mib(field: str):
+    """A memory field of /proc/self/status in MiB, or None off Linux."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    """Resets the process's peak RSS to its current RSS, where Linux allows it."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def measure(stage: str, n_rows: int, memory: bool = True, arrow_strings: bool = False) -> dict:
+    """
+    Rows/sec, the peak RSS growth and, with memory, the peak traced MiB of one
+    stage at one scale.
+    """
+    run = STAGES[stage](n_rows, arrow_strings)
+    try:
+        gc.collect()
+        rss_start = _rss_mib('VmRSS') if _reset_peak_rss() else None
+        started = time.perf_counter()
+        _quiet(run)
+        seconds = time.perf_counter() - started
+        peak_rss_mib = None
+        if rss_start is not None:
+            peak_rss_mib = _rss_mib('VmHWM') - rss_start
+
+        peak_mib = None
+        if memory:
+            gc.collect()
+            tracemalloc.start()
+            try:
+                _quiet(run)
+                peak_mib = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            finally:
+                tracemalloc.stop()
+    finally:
+        getattr(run, 'cleanup', lambda: None)()
+    return {
+        'rows': n_rows,
+        'seconds': round(seconds, 4),
+        'rows_per_second': round(n_rows / seconds, 1),
+        'peak_mib': None if peak_mib is None else round(peak_mib, 2),
+        'peak_rss_mib': None if peak_rss_mib is None else round(peak_rss_mib, 2),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regression messages for results that are worse than the baseline."""
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        if result['rows_per_second'] < reference['rows_per_second'] * (1 - tolerance):
+            regressions.append(f"{key}: {result['rows_per_second']:,.0f} rows/s, "
+                               f"baseline {reference['rows_per_second']:,.0f}")
+        if (result['peak_mib'] is not None and reference.get('peak_mib')
+                and result['peak_mib'] > reference['peak_mib'] * (1 + tolerance)):
+            regressions.append(f"{key}: peak {result['peak_mib']:.1f} MiB, baseline {reference['peak_mib']:.1f} MiB")
+        if (result.get('peak_rss_mib') is not None and reference.get('peak_rss_mib')
+                and result['peak_rss_mib'] > reference['peak_rss_mib'] * (1 + tolerance)):
+            regressions.append(f"{key}: peak RSS +{result['peak_rss_mib']:.1f} MiB, "
+                               f"baseline +{reference['peak_rss_mib']:.1f} MiB")
+    return regressions
+
+
+def load_baseline(path: str = BASELINE_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(data: dict, path: str = BASELINE_PATH):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the cleaning stages.')
+    parser.add_argument('--scales', default=DEFAULT_SCALES, help='comma-separated row counts, e.g. 10k,1m,10m')
+    parser.add_argument('--stages', default=','.join(STAGES), help='comma-separated stage names')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('--arrow-strings', action='store_true', help='run on Arrow-backed strings')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed slowdown / memory growth before failing (0.3 = 30%%)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--output', help='also write the results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    results = {}
+    suffix = '/arrow' if args.arrow_strings else ''
+    print(f"{'stage':<30} {'rows':>10} {'seconds':>9} {'rows/s':>12} {'peak MiB':>9} {'RSS MiB':>9}")
+    for n_rows in (parse_scale(scale) for scale in args.scales.split(',')):
+        for stage in stages:
+            result = measure(stage, n_rows, memory=not args.no_memory, arrow_strings=args.arrow_strings)
+            results[f'{stage}@{n_rows}{suffix}'] = result
+            peak = '-' if result['peak_mib'] is None else f"{result['peak_mib']:.1f}"
+            rss = '-' if result['peak_rss_mib'] is None else f"{result['peak_rss_mib']:.1f}"
+            print(f"{stage:<30} {n_rows:>10,} {result['seconds']:>9.3f} "
+                  f"{result['rows_per_second']:>12,.0f} {peak:>9} {rss:>9}", flush=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    baseline = load_baseline(args.baseline)
+    if args.save_baseline:
+        baseline.setdefault('results', {}).update(results)
+        baseline['machine'] = f"{platform.python_implementation()} {platform.python_version()} on {platform.platform()}"
+        save_baseline(baseline, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline.get('results', {}), args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if not baseline.get('results'):
+        print("No baseline to compare with; run with --save-baseline first.")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# benchmarks/startup.py
+"""
+Cold-start budget for the command line entry point.
+
+    python -m benchmarks.startup [--runs 7]
+
+Times `python -m cli --help` in fresh interpreters against a bare
+`python -c pass`, and checks that importing cli loads none of the heavy
+modules. Exits with 1 if the overhead exceeds STARTUP_BUDGET_SECONDS or a
+heavy module is imported at startup, so it can run in the nightly job.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Time allowed on top of the bare interpreter start, in seconds.
+STARTUP_BUDGET_SECONDS = 0.15
+
+# Modules that must not be loaded until there is something to clean.
+HEAVY_MODULES = ('tkinter', 'pandas', 'numpy', 'openpyxl', 'processor')
+
+
+def _median_seconds(args, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=REPO_ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def _heavy_imports():
+    code = (
+        "import sys, cli; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, check=True,
+                            capture_output=True, text=True).stdout.strip()
+    return [module for module in output.split(',') if module]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    interpreter = _median_seconds(['-c', 'pass'], args.runs)
+    cli_help = _median_seconds(['-m', 'cli', '--help'], args.runs)
+    overhead = cli_help - interpreter
+    heavy = _heavy_imports()
+
+    print(f"interpreter start:  {interpreter * 1000:7.1f} ms")
+    print(f"cli --help:         {cli_help * 1000:7.1f} ms")
+    print(f"overhead:           {overhead * 1000:7.1f} ms (budget {STARTUP_BUDGET_SECONDS * 1000:.0f} ms)")
+    if heavy:
+        print(f"FAIL: importing cli loads {', '.join(heavy)}")
+    if overhead > STARTUP_BUDGET_SECONDS:
+        print("FAIL: startup budget exceeded")
+    return 1 if heavy or overhead > STARTUP_BUDGET_SECONDS else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
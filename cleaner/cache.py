@@ -0,0 +1,149 @@
+# cleaner/cache.py
+"""
+Persistent raw -> clean mapping shared across runs, in a SQLite file.
+
+Keys are (kind, rules version, raw value), so changing the suffix tables,
+the special cases or the public suffix snapshot gives a new rules version.
+Old entries then stop matching, and the first store under a new version
+drops them. Lookups are batched per column: the distinct raw values go
+into a temporary table and are joined against the cache in one query.
+
+The cache holds at most `max_entries` values. Each hit stamps the entry
+with the current hour, and the least recently used entries go first when
+the cache is full. Counting the entries scans the whole table, so each
+connection keeps a running count instead: it is counted at open, after
+evictions and purges, every COUNT_EVERY stores (other processes add
+entries too) and whenever the running count passes the limit. Entries already stamped this hour aren't rewritten, so
+a warm re-run mostly just reads. WAL mode lets the worker processes of a
+bulk run share the file.
+"""
+import contextlib
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_ENTRIES = 2_000_000
+# Share of entries removed at a time once the cache is full.
+_EVICT_FRACTION = 0.1
+# Stores between two real counts of the entries.
+COUNT_EVERY = 64
+
+
+def _current_hour() -> int:
+    return int(time.time() // 3600)
+
+
+class CleanCache:
+    """One connection to a cache file. Use it as a context manager, or call close()."""
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._purged = set()
+        # Autocommit; writes take the lock up front in _write() so that
+        # concurrent writers wait for each other instead of failing.
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('PRAGMA cache_size=-131072')  # 128 MiB
+        with self._write():
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS clean_values ('
+                'kind TEXT, version TEXT, raw TEXT, clean TEXT, used INTEGER, '
+                'PRIMARY KEY (kind, version, raw)) WITHOUT ROWID')
+        self._db.execute('PRAGMA temp_store=MEMORY')
+        self._db.execute('CREATE TEMP TABLE lookup (position INTEGER, raw TEXT)')
+        self._size = self._count()
+        self._stores = 0
+
+    def _count(self) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM clean_values').fetchone()[0]
+
+    @contextlib.contextmanager
+    def _write(self):
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        self._db.execute('COMMIT')
+
+    def lookup(self, kind: str, version: str, raws: list) -> tuple:
+        """
+        (positions, cleans) of the raws found in the cache; a clean value
+        that is missing is None.
+        """
+        # The lookup table is private to this connection, so filling it takes no shared lock.
+        self._db.execute('BEGIN')
+        self._db.execute('DELETE FROM lookup')
+        # Sorted raws walk the cache's key order instead of jumping around it.
+        order = sorted(range(len(raws)), key=raws.__getitem__)
+        self._db.executemany('INSERT INTO lookup VALUES (?, ?)', ((i, raws[i]) for i in order))
+        found = self._db.execute(
+            'SELECT l.position, v.clean FROM lookup l JOIN clean_values v '
+            'ON v.kind = ? AND v.version = ? AND v.raw = l.raw', (kind, version)).fetchall()
+        self._db.execute('COMMIT')
+        if found:
+            used = _current_hour()
+            with self._write():
+                self._db.execute(
+                    'UPDATE clean_values SET used = ? WHERE kind = ? AND version = ? '
+                    'AND raw IN (SELECT raw FROM lookup) AND used < ?', (used, kind, version, used))
+        positions, cleans = zip(*found) if found else ((), ())
+        return np.array(positions, dtype=np.int64), list(cleans)
+
+    def store(self, kind: str, version: str, raws: list, cleans: list):
+        """Adds raw -> clean pairs, evicting the least recently used entries if full."""
+        with self._write():
+            recount = False
+            if (kind, version) not in self._purged:
+                # Entries of an older rules version can't match any more.
+                self._db.execute('DELETE FROM clean_values WHERE kind = ? AND version != ?', (kind, version))
+                self._purged.add((kind, version))
+                recount = True
+            used = _current_hour()
+            self._db.executemany(
+                'INSERT OR REPLACE INTO clean_values VALUES (?, ?, ?, ?, ?)',
+                ((kind, version, raw, clean, used) for raw, clean in zip(raws, cleans)))
+            # Replaced entries are counted as new, so the running count only errs high.
+            self._size += len(raws)
+            self._stores += 1
+            if recount or self._size > self.max_entries or self._stores % COUNT_EVERY == 0:
+                self._size = self._count()
+            if self._size > self.max_entries:
+                excess = self._size - self.max_entries + int(self.max_entries * _EVICT_FRACTION)
+                self._db.execute(
+                    'DELETE FROM clean_values WHERE (kind, version, raw) IN '
+                    '(SELECT kind, version, raw FROM clean_values ORDER BY used LIMIT ?)', (excess,))
+                self._size = self._count()
+
+    def clean(self, kind: str, version: str, raws: pd.Series, clean_values) -> np.ndarray:
+        """
+        Cleans distinct raw strings, running `clean_values` only on those the
+        cache doesn't have. Returns an array aligned with `raws`.
+        """
+        positions, cleans = self.lookup(kind, version, raws.tolist())
+        cleaned = np.empty(len(raws), dtype=object)
+        cleaned[positions] = cleans
+        missing = np.ones(len(raws), dtype=bool)
+        missing[positions] = False
+        if missing.any():
+            misses = raws[missing].reset_index(drop=True)
+            new_values = clean_values(misses).to_numpy(dtype=object)
+            cleaned[missing] = new_values
+            self.store(kind, version, misses.tolist(), [None if pd.isna(v) else v for v in new_values])
+        # Values that clean to nothing are stored as NULL.
+        cleaned[pd.isna(cleaned)] = pd.NA
+        return cleaned
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,51 +1,88 @@
 # cleaner/clean_domains.py
+import hashlib
 import pandas as pd
 import re
+from cleaner.rules import DEFAULT_MULTI_PART_SUFFIXES, active_rules
+from cleaner.suffixes import SuffixIndex, load_suffix_index
+from cleaner.utils import ARROW_STRING, _clean_distinct, is_arrow_string
 
-# A set of common multi-part public suffixes. This is necessary to correctly
-# parse domains like 'google.co.uk' without an external library like tldextract.
-MULTI_PART_SUFFIXES = {
-    '.co.uk', '.org.uk', '.com.au', '.net.au', '.com.sa', '.com.br',
-    '.com.mx', '.co.jp', '.co.za', '.co.in', '.com.cn', '.com.tw'
-}
+# The built-in extra multi-part suffixes on top of the bundled public suffix
+# snapshot (see cleaner/suffixes.py). Add local entries with a rules file
+# (see cleaner/rules.py).
+MULTI_PART_SUFFIXES = DEFAULT_MULTI_PART_SUFFIXES
 
-def clean_company_domains(series: pd.Series) -> pd.Series:
+# Steps 2-4 in one anchored pass: skip the protocol and 'www' prefix and
+# capture the host up to the first path, query or fragment separator.
+_HOST_RE = re.compile(r'^(?:[a-z]+://)?(?:www\d*\.)?([^/?#]*)')
+
+_suffix_index = None
+_suffix_index_rules = None
+
+def _get_suffix_index() -> SuffixIndex:
+    """
+    The public suffix snapshot plus the multi-part suffixes of the active
+    rule set, compiled on first use and again only if the rule set changes.
+    """
+    global _suffix_index, _suffix_index_rules
+    rule_set = active_rules()
+    if _suffix_index is None or _suffix_index_rules is not rule_set:
+        snapshot = load_suffix_index()
+        _suffix_index = SuffixIndex(rule_set.multi_part_suffixes, version=snapshot.version)
+        for table in ('rules', 'wildcards', 'exceptions', 'prefixes'):
+            for depth, entries in getattr(snapshot, table).items():
+                getattr(_suffix_index, table).setdefault(depth, set()).update(entries)
+        _suffix_index_rules = rule_set
+    return _suffix_index
+
+def rules_version() -> str:
+    """Hash of the suffix tables the domains are cleaned with; keys the clean cache."""
+    suffix_index = _get_suffix_index()
+    key = '\n'.join([suffix_index.version, _HOST_RE.pattern, *sorted(_suffix_index_rules.multi_part_suffixes)])
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+def clean_domain(domain):
+    """
+    Cleans a single URL or domain. clean_company_domains runs it once per
+    distinct value of a series.
+    """
+    if pd.isna(domain):
+        return pd.NA
+
+    # 1. Basic cleaning: lowercase, strip whitespace.
+    domain = str(domain).strip().lower()
+
+    # 2-4. Remove protocol (http://, https://, etc.), the 'www' prefix and
+    # the path, query parameters, fragments, etc.
+    domain = _HOST_RE.match(domain).group(1)
+
+    # 5. Keep the public suffix (e.g., .com, .co.uk, .com.sg) plus one label.
+    parts = domain.split('.')
+    suffix_length = _get_suffix_index().suffix_length(parts)
+    if len(parts) > suffix_length:
+        return '.'.join(parts[-suffix_length - 1:])
+
+    # 6. If the host is itself a public suffix, keep its last two parts.
+    if len(parts) >= 2:
+        return '.'.join(parts[-2:])
+
+    # If all else fails, it's not a valid-looking domain.
+    return pd.NA
+
+def clean_company_domains(series: pd.Series, cache=None) -> pd.Series:
     """
     Cleans and extracts the root domain from a series of URLs or domains.
     e.g., 'http://www.google.co.uk/path' -> 'google.co.uk'
+    Each distinct value is cleaned once, and with a CleanCache, only if the
+    cache doesn't already hold it. Arrow-backed strings (see
+    cleaner.utils.ARROW_STRING) stay Arrow-backed.
     """
-    def clean_domain(domain):
-        if pd.isna(domain):
-            return pd.NA
-
-        # 1. Basic cleaning: lowercase, strip whitespace.
-        domain = str(domain).strip().lower()
-
-        # 2. Remove protocol (http://, https://, etc.)
-        domain = re.sub(r'^[a-z]+://', '', domain)
-
-        # 3. Remove 'www' prefix.
-        domain = re.sub(r'^www\d*\.', '', domain)
-
-        # 4. Remove path, query parameters, fragments, etc.
-        domain = domain.split('/')[0].split('?')[0].split('#')[0]
-
-        # 5. Handle multi-part suffixes first (e.g., .co.uk, .com.sa)
-        for suffix in MULTI_PART_SUFFIXES:
-            if domain.endswith(suffix):
-                # Remove the suffix to find the part before it
-                base = domain[:-len(suffix)]
-                # The main domain is the last part of the base
-                main_domain_part = base.split('.')[-1]
-                return main_domain_part + suffix
-
-        # 6. If not a multi-part suffix, handle standard domains (e.g., .com, .org)
-        parts = domain.split('.')
-        if len(parts) >= 2:
-            # Join the last two parts to form the domain
-            return '.'.join(parts[-2:])
-
-        # If all else fails, it's not a valid-looking domain.
-        return pd.NA
+    result = pd.Series(pd.NA, index=series.index, dtype=ARROW_STRING if is_arrow_string(series) else object)
+    present = series.notna()
+    if present.any():
+        result.loc[present] = _clean_distinct(series[present], _clean_hosts, cache, 'domain', rules_version())
+    return result
 
-    return series.apply(clean_domain)
\ No newline at end of file
+def _clean_hosts(hosts: pd.Series) -> pd.Series:
+    """clean_domain over distinct values. Arrow-backed values come back Arrow-backed."""
+    roots = pd.Series([clean_domain(host) for host in hosts.astype(object)], index=hosts.index, dtype=object)
+    return roots.astype(ARROW_STRING) if is_arrow_string(hosts) else roots
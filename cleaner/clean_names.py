@@ -1,24 +1,53 @@
 # cleaner/clean_names.py
+import hashlib
+import json
 import pandas as pd
 import re
-from cleaner.utils import _is_likely_domain
-
-# The definitive, expanded list of suffixes.
-SUFFIXES_TO_REMOVE = [
-    'Inc', 'Corp', 'Corporation', 'Incorporated', 'Company', 'Co', 'Technologies',
-    'Holdings', 'Group', 'Solutions', 'Services', 'Systems', 'Associates',
-    'LLC', 'Ltd', 'LLP', 'LP', 'PC', 'PLC', 'GmbH', 'AG', 'SARL', 'SA',
-    'AB', 'BV', 'SpA', 'Srl', 'SL', 'SA de CV', 'Platforms', 'Stores',
-    'Motors', 'Wholesale', 'Coffee', 'International', 'Service', 'Association',
-    'Business', 'Machines', 'Mbh', 'Ggmbh', 'Kg', 'UK'
-]
-
-# A dictionary for special capitalization cases that .title() gets wrong.
-SPECIAL_CASES = {
-    'Jpmorgan': 'JPMorgan',
-    'Hp': 'HP',
-    'Ibm': 'IBM'
-}
+from cleaner.rules import DEFAULT_SPECIAL_CASES, DEFAULT_SUFFIXES, active_rules
+from cleaner.utils import ARROW_STRING, _is_likely_domain, _clean_distinct, is_arrow_string, likely_domain_mask
+
+# The built-in suffix and special-case tables (see cleaner/rules.py; a rules
+# file can extend them).
+SUFFIXES_TO_REMOVE = DEFAULT_SUFFIXES
+SPECIAL_CASES = DEFAULT_SPECIAL_CASES
+
+# --- Precompiled rules, built once on first use ---
+_WHITESPACE_RE = re.compile(r'\s+')
+_PARENTHETICAL_RE = re.compile(r'\s*\(.*\)\s*$')
+_DASH_SEPARATOR_RE = re.compile(r'\s+[-–—]\s+.*')
+# 'The X Company' and 'The X Group' both reduce to 'X'.
+_THE_X_RE = re.compile(r'(?i)^The\s+(.+?)\s+(?:Company|Group)$')
+_COUNTRY_CODE_RE = re.compile(r'\s+\b[A-Z]{2}$')
+_POSSESSIVE_RE = re.compile(r"([A-Za-z])['’]S\b")
+
+_compiled_rules = None
+
+def _rules() -> dict:
+    """
+    Compiles the table-driven rules of the active rule set (see
+    cleaner/rules.py) on first use, and again only if the active set changes.
+    """
+    global _compiled_rules
+    rule_set = active_rules()
+    if _compiled_rules is None or _compiled_rules['rule_set'] is not rule_set:
+        special_cases = rule_set.special_cases
+        _compiled_rules = {
+            'rule_set': rule_set,
+            'suffix': re.compile(r'[\s,&\-]+\b(?:' + rule_set.suffix_pattern + r')\b\.?$', re.IGNORECASE),
+            # All special cases are replaced in a single scan, longest first.
+            'special': rule_set.special_case_pattern,
+            'fix_special': lambda match: special_cases[match.group(0)],
+            'version': hashlib.sha256(json.dumps(
+                [rule_set.version,
+                 [rule.pattern for rule in (_WHITESPACE_RE, _PARENTHETICAL_RE, _DASH_SEPARATOR_RE,
+                                            _THE_X_RE, _COUNTRY_CODE_RE, _POSSESSIVE_RE)]],
+                sort_keys=True).encode()).hexdigest()[:16],
+        }
+    return _compiled_rules
+
+def rules_version() -> str:
+    """Hash of the tables and patterns the names are cleaned with; keys the clean cache."""
+    return _rules()['version']
 
 def clean_company_name(name):
     """
@@ -26,37 +55,29 @@ def clean_company_name(name):
     """
     if pd.isna(name):
         return name
+    rules = _rules()
 
     # Pass 1: Initial, aggressive cleanup of junk characters and whitespace.
     name = str(name)
-    name = re.sub(r'\s+', ' ', name).strip() # Normalize whitespace
-    name = re.sub(r'\s*\(.*\)\s*$', '', name).strip() # Remove parentheticals
-    name = re.sub(r'\s+[-–—]\s+.*', '', name).strip() # Remove dash separators
+    name = _WHITESPACE_RE.sub(' ', name).strip() # Normalize whitespace
+    name = _PARENTHETICAL_RE.sub('', name).strip() # Remove parentheticals
+    name = _DASH_SEPARATOR_RE.sub('', name).strip() # Remove dash separators
 
     # Pass 2: Handle special "The X ..." formats.
-    the_company_match = re.match(r'(?i)^The\s+(.+?)\s+Company$', name)
-    the_group_match = re.match(r'(?i)^The\s+(.+?)\s+Group$', name)
-    if the_company_match:
-        name = the_company_match.group(1).strip()
-    elif the_group_match:
-        name = the_group_match.group(1).strip()
+    name = _THE_X_RE.sub(r'\1', name).strip()
 
     # Pass 3: Iteratively remove known suffixes from the end of the string.
-    for _ in range(2): 
-        suffix_pattern = r'[\s,&\-]+\b(?:' + r'|'.join(re.escape(s) for s in SUFFIXES_TO_REMOVE) + r')\b\.?$'
-        name = re.sub(suffix_pattern, '', name, flags=re.IGNORECASE).strip()
+    for _ in range(2):
+        name = rules['suffix'].sub('', name).strip()
 
     # Pass 4: Remove any standalone 2-letter uppercase country codes from the end.
-    name = re.sub(r'\s+\b[A-Z]{2}$', '', name)
+    name = _COUNTRY_CODE_RE.sub('', name)
 
     # Pass 5: Final capitalization and special case fixes.
     name = name.title()
-    name = re.sub(r"([A-Za-z])['’]S\b", r"\1's", name)
-
-    # Apply special casing rules
-    for wrong, right in SPECIAL_CASES.items():
-        if wrong in name:
-            name = name.replace(wrong, right)
+    name = _POSSESSIVE_RE.sub(r"\1's", name)
+    if rules['special'] is not None:
+        name = rules['special'].sub(rules['fix_special'], name)
 
     # Final check for any names that might be domains
     if _is_likely_domain(name):
@@ -64,8 +85,61 @@ def clean_company_name(name):
 
     return name
 
-def clean_company_names(series: pd.Series) -> pd.Series:
+def _normalize_names(names: pd.Series) -> pd.Series:
+    """
+    Runs the passes of clean_company_name column-wise over a series of
+    strings without missing values.
+    """
+    rules = _rules()
+
+    # Pass 1: whitespace, parentheticals and dash separators.
+    names = names.str.replace(_WHITESPACE_RE, ' ', regex=True).str.strip()
+    names = names.str.replace(_PARENTHETICAL_RE, '', regex=True).str.strip()
+    names = names.str.replace(_DASH_SEPARATOR_RE, '', regex=True).str.strip()
+
+    # Pass 2: "The X Company" / "The X Group".
+    names = names.str.replace(_THE_X_RE, r'\1', regex=True).str.strip()
+
+    # Pass 3: suffixes, twice to catch 'Foo Holdings Inc'.
+    for _ in range(2):
+        names = names.str.replace(rules['suffix'], '', regex=True).str.strip()
+
+    # Pass 4: trailing country codes.
+    names = names.str.replace(_COUNTRY_CODE_RE, '', regex=True)
+
+    # Pass 5: capitalization and special cases.
+    names = names.str.title().str.replace(_POSSESSIVE_RE, r"\1's", regex=True)
+    if rules['special'] is not None:
+        names = names.str.replace(rules['special'], rules['fix_special'], regex=True)
+
+    # Names that look like domains are lowercased.
+    is_domain = likely_domain_mask(names)
+    return names.where(~is_domain, names.str.lower())
+
+def _normalize_distinct(names: pd.Series) -> pd.Series:
+    """
+    _normalize_names over distinct values. pyarrow's case and whitespace
+    kernels follow other Unicode rules than Python's str methods ('İ', 'ß'),
+    so Arrow-backed values that aren't pure ASCII go through object strings.
+    """
+    if is_arrow_string(names):
+        ascii_only = names.str.isascii().to_numpy(dtype=bool)
+        if not ascii_only.all():
+            normalized = pd.Series(pd.NA, index=names.index, dtype=ARROW_STRING)
+            normalized[ascii_only] = _normalize_names(names[ascii_only])
+            normalized[~ascii_only] = _normalize_names(names[~ascii_only].astype(object))
+            return normalized
+    return _normalize_names(names)
+
+def clean_company_names(series: pd.Series, cache=None) -> pd.Series:
     """
     Applies the robust cleaning function to an entire series of company names.
+    Each distinct name is cleaned once; missing values are passed through unchanged.
+    With a CleanCache, names it already holds are not cleaned again.
+    Arrow-backed strings (see cleaner.utils.ARROW_STRING) stay Arrow-backed.
     """
-    return series.apply(clean_company_name)
\ No newline at end of file
+    result = series.copy() if is_arrow_string(series) else series.astype(object)
+    present = series.notna()
+    if present.any():
+        result.loc[present] = _clean_distinct(series[present], _normalize_distinct, cache, 'name', rules_version())
+    return result
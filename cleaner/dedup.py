@@ -0,0 +1,130 @@
+# cleaner/dedup.py
+"""
+Folder-wide duplicate removal for bulk runs.
+
+Every cleaned value is reduced to a 64-bit hash, seeded with its type so a
+name and a domain never collide on purpose. The hashes go into a KeyIndex:
+sorted uint64 runs that are searched with binary search. Once the runs in
+memory hold more than `memory_keys` keys, they are merged and written to a
+temporary .npy file. That file is then searched memory-mapped, so the index
+can grow past RAM. Tens of millions of keys cost 8 bytes each. With 64-bit
+hashes, a false "already seen" is about as likely as n^2 / 2^65 (below
+1e-4 at 50M keys).
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from cleaner import sinks
+
+# Keys held in memory before the index spills to disk (8 bytes each).
+DEFAULT_MEMORY_KEYS = 8_000_000
+# Sorted runs kept in memory before they are merged into one.
+_MAX_MEMORY_RUNS = 8
+
+
+def hash_keys(values, kind: str) -> np.ndarray:
+    """64-bit hashes of cleaned values; `kind` ('name' or 'domain') seeds the hash."""
+    values = np.asarray(values, dtype=object)
+    return pd.util.hash_array(values, hash_key=kind.ljust(16)[:16], categorize=False)
+
+
+def _contains(run, keys):
+    positions = np.searchsorted(run, keys)
+    found = positions < len(run)
+    found[found] = run[positions[found]] == keys[found]
+    return found
+
+
+class KeyIndex:
+    """
+    A set of uint64 keys that only grows. Use it as a context manager, or call
+    close(), to remove the spill files.
+    """
+
+    def __init__(self, memory_keys: int = DEFAULT_MEMORY_KEYS, spill_dir: str = None):
+        self.memory_keys = memory_keys
+        self._spill_parent = spill_dir
+        self._spill_dir = None
+        self._memory_runs = []
+        self._disk_runs = []
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def contains(self, keys: np.ndarray) -> np.ndarray:
+        """Boolean mask of the keys already in the index."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        # Sorted queries make the binary searches walk each run in order.
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        found = np.zeros(len(keys), dtype=bool)
+        for run in self._disk_runs + self._memory_runs:
+            found |= _contains(run, sorted_keys)
+        result = np.empty(len(keys), dtype=bool)
+        result[order] = found
+        return result
+
+    def add_new(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Adds keys to the index. Returns a mask of those that were new: not in
+        the index and not repeated earlier in `keys`.
+        """
+        keys = np.asarray(keys, dtype=np.uint64)
+        new = ~self.contains(keys)
+        _, first = np.unique(keys, return_index=True)
+        first_occurrence = np.zeros(len(keys), dtype=bool)
+        first_occurrence[first] = True
+        new &= first_occurrence
+        if new.any():
+            self._memory_runs.append(np.sort(keys[new]))
+            self._size += int(new.sum())
+            self._compact()
+        return new
+
+    def _compact(self):
+        in_memory = sum(len(run) for run in self._memory_runs)
+        if in_memory > self.memory_keys:
+            self._spill(np.concatenate(self._memory_runs))
+            self._memory_runs = []
+        elif len(self._memory_runs) > _MAX_MEMORY_RUNS:
+            self._memory_runs = [np.sort(np.concatenate(self._memory_runs))]
+
+    def _spill(self, keys):
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='tal_dedup_', dir=self._spill_parent)
+        path = os.path.join(self._spill_dir, f'run_{len(self._disk_runs)}.npy')
+        np.save(path, np.sort(keys))
+        self._disk_runs.append(np.load(path, mmap_mode='r'))
+
+    def close(self):
+        self._memory_runs, self._disk_runs = [], []
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def dedup_clean_file(path: str, kind: str, index: KeyIndex, chunksize: int = 1_000_000) -> tuple:
+    """
+    Drops the values of a cleaned file that are already in `index` and adds
+    the rest. The file is rewritten through an output sink of the same
+    format, chunk by chunk. Returns (kept_rows, already_seen_rows).
+    """
+    kept = seen = 0
+    with sinks.open_sink(path, column=kind) as sink:
+        for values in sinks.read_values(path, chunksize):
+            new = index.add_new(hash_keys(values.to_numpy(), kind))
+            sink.write(values[new].to_frame())
+            kept += int(new.sum())
+            seen += int((~new).sum())
+    return kept, seen
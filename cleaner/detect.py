@@ -1,41 +1,89 @@
 # cleaner/detect.py
+import re
+import numpy as np
 import pandas as pd
-from cleaner.utils import _is_likely_domain
+from cleaner.rules import DEFAULT_DOMAIN_KEYWORDS, DEFAULT_NAME_KEYWORDS, active_rules
+from cleaner.utils import _is_likely_domain, likely_domain_mask
 
-# --- Keyword sets for header detection ---
-NAME_KEYWORDS = {
-    'name', 'account', 'company', 'organization', 'customer', 'prospect', 'client'
-}
-DOMAIN_KEYWORDS = {
-    'domain', 'website', 'url', 'web address'
-}
+# --- Built-in keyword sets for header detection (see cleaner/rules.py) ---
+NAME_KEYWORDS = DEFAULT_NAME_KEYWORDS
+DOMAIN_KEYWORDS = DEFAULT_DOMAIN_KEYWORDS
+
+# Detection looks at most at this many rows, spread evenly over the sheet.
+DETECT_SAMPLE_ROWS = 10_000
+# Values are classified in batches; classification stops once the domain ratio
+# is further from 0.5 than DETECT_Z standard errors (worst case p = 0.5).
+# Each batch is strided over the whole sample, so a sorted column can't
+# decide the type from its first rows.
+DETECT_BATCH_SIZE = 200
+DETECT_Z = 4.0
+
+_keyword_matcher = None
+_keyword_matcher_rules = None
+
+def _get_keyword_matcher():
+    """
+    One regex telling, for a lowercased header, whether it contains a domain
+    keyword and whether it contains a name keyword. Compiled on first use,
+    and again only if the active rule set changes.
+    """
+    global _keyword_matcher, _keyword_matcher_rules
+    rule_set = active_rules()
+    if _keyword_matcher is None or _keyword_matcher_rules is not rule_set:
+        def alternation(keywords):
+            # An empty set never matches.
+            return '|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)) or '(?!)'
+        _keyword_matcher = re.compile(
+            r'(?=.*?(?P<domain>' + alternation(rule_set.domain_keywords) + r'))?'
+            r'(?=.*?(?P<name>' + alternation(rule_set.name_keywords) + r'))?',
+            re.DOTALL
+        )
+        _keyword_matcher_rules = rule_set
+    return _keyword_matcher
+
+def _match_keywords(columns) -> pd.DataFrame:
+    """Boolean 'domain' and 'name' flags per column header, in column order."""
+    headers = pd.Series([str(col).lower() for col in columns], dtype=object)
+    flags = headers.str.extract(_get_keyword_matcher()).notna()
+    return flags.reindex(columns=['domain', 'name'], fill_value=False)
+
+def _sample_rows(df: pd.DataFrame, n_rows: int = None) -> pd.DataFrame:
+    """At most `n_rows` rows of df, evenly spaced so the whole sheet is represented."""
+    n_rows = n_rows or DETECT_SAMPLE_ROWS
+    if len(df) <= n_rows:
+        return df
+    return df.iloc[np.linspace(0, len(df) - 1, n_rows).astype(np.int64)]
 
 def detect_column_by_content(df: pd.DataFrame) -> str:
     """
     FALLBACK METHOD: Detects the main column by selecting the one
     with the most non-null values.
     """
-    max_count = -1
-    main_col = None
-    for col in df.columns:
-        count = df[col].notna().sum()
-        if count > max_count:
-            max_count = count
-            main_col = col
-    if main_col is None and not df.columns.empty:
-        main_col = df.columns[0]
-    return main_col
+    if df.columns.empty:
+        return None
+    # One vectorized count over the sample; the first column wins ties.
+    counts = _sample_rows(df).notna().sum().to_numpy()
+    return df.columns[int(np.argmax(counts))]
 
 def detect_type_by_content(series: pd.Series) -> str:
     """
     FALLBACK METHOD: Determines if a series contains names or domains
     by analyzing its content.
     """
-    series = series.dropna()
+    series = _sample_rows(series.dropna())
     if series.empty:
         return 'name'
-    domain_count = series.apply(_is_likely_domain).sum()
-    if (domain_count / len(series)) >= 0.5:
+    # Values are checked in batches, stopping once the ratio is clearly decided.
+    # Batch k takes every n_batches-th value from k, so each one spans the sheet.
+    n_batches = -(-len(series) // DETECT_BATCH_SIZE)
+    domain_count = checked = 0
+    for k in range(n_batches):
+        batch = series.iloc[k::n_batches]
+        domain_count += int(likely_domain_mask(batch).sum())
+        checked += len(batch)
+        if abs(domain_count / checked - 0.5) > DETECT_Z * 0.5 / np.sqrt(checked):
+            break
+    if (domain_count / checked) >= 0.5:
         return 'domain'
     else:
         return 'name'
@@ -47,20 +95,23 @@ def find_target_column_and_type(df: pd.DataFrame) -> tuple:
     name_col, domain_col = None, None
     
     # Priority 1: Scan headers for keywords
-    for col in df.columns:
-        col_lower = str(col).lower()
-        
-        # Use an if/elif structure to prevent a single column from matching both types.
-        # Domain keywords are typically more specific, so we check for them first.
-        if not domain_col and any(keyword in col_lower for keyword in DOMAIN_KEYWORDS):
-            domain_col = col
-        elif not name_col and any(keyword in col_lower for keyword in NAME_KEYWORDS):
-            name_col = col
+    flags = _match_keywords(df.columns)
+    is_domain = flags['domain'].to_numpy()
+    if is_domain.any():
+        domain_col = df.columns[int(np.argmax(is_domain))]
+    # A column is never both: domain keywords are more specific, so the
+    # domain column cannot also be the name column.
+    is_name = flags['name'].to_numpy().copy()
+    if domain_col is not None:
+        is_name[int(np.argmax(is_domain))] = False
+    if is_name.any():
+        name_col = df.columns[int(np.argmax(is_name))]
 
     # Priority 2: Apply the decision logic
     if name_col and domain_col:
-        name_count = df[name_col].notna().sum()
-        domain_count = df[domain_col].notna().sum()
+        sample = _sample_rows(df)
+        name_count = sample[name_col].notna().sum()
+        domain_count = sample[domain_col].notna().sum()
         
         if name_count > 0 and (domain_count / name_count) < 0.70:
             return name_col, 'name'
@@ -76,4 +127,16 @@ def find_target_column_and_type(df: pd.DataFrame) -> tuple:
     # Case 4: No keyword matches, use the fallback method
     fallback_col = detect_column_by_content(df)
     fallback_type = detect_type_by_content(df[fallback_col])
-    return fallback_col, fallback_type
\ No newline at end of file
+    return fallback_col, fallback_type
+
+def has_header_row(columns, main_col, col_type: str) -> bool:
+    """
+    Decides whether the first row of a sheet, parsed as `columns`, is a header.
+    It is unless no cell matches a header keyword and the target column's
+    first cell looks like data of its type (e.g. a domain).
+    """
+    if _match_keywords(columns).to_numpy().any():
+        return True
+    if col_type == 'domain' and _is_likely_domain(str(main_col)):
+        return False
+    return True
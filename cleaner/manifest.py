@@ -0,0 +1,174 @@
+# cleaner/manifest.py
+"""
+Manifest for incremental bulk runs, kept as clean_companies/manifest.json.
+
+For every input file the manifest records its size, mtime and SHA-256,
+its sheets, its tal_info records and the outputs they wrote. On a re-run,
+an input is unchanged when its size and mtime match. If they don't, the
+content hash is checked, so a file that was only touched is not cleaned
+again. Unchanged inputs reuse their records. Outputs of inputs that
+disappeared are deleted.
+
+The whole manifest is dropped when the rules version or the options that
+shape the outputs change, and the outputs it lists that the next run
+doesn't write again are deleted. The rules version hashes the cleaning code
+and its data files.
+"""
+import functools
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+_CLEANER_DIR = os.path.dirname(os.path.abspath(__file__))
+# The modules and data files whose changes can change a cleaned output.
+RULE_SOURCES = ('clean_names.py', 'clean_domains.py', 'suffixes.py', 'detect.py', 'readers.py', 'utils.py',
+                'near_duplicates.py', 'sinks.py', 'rules.py', os.path.join('data', 'public_suffix_list.dat'))
+
+
+@functools.lru_cache(maxsize=None)
+def rules_version(*extra_paths: str) -> str:
+    """
+    Short hash of RULE_SOURCES plus `extra_paths` (e.g. processor.py). Paths
+    that don't exist, as in a frozen build, are left out.
+    """
+    digest = hashlib.sha256()
+    for path in [os.path.join(_CLEANER_DIR, name) for name in RULE_SOURCES] + list(extra_paths):
+        if os.path.exists(path):
+            digest.update(os.path.basename(path).encode())
+            digest.update(file_digest(path).encode())
+    return digest.hexdigest()[:16]
+
+
+def file_digest(path: str, block_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def discard(clean_folder: str):
+    """Removes the manifest, e.g. after a run that rewrote outputs without it."""
+    _remove(os.path.join(clean_folder, MANIFEST_NAME))
+
+
+class Manifest:
+    """
+    The entries of one clean_companies folder. `settings` holds the rules
+    version and the options that shape the outputs; a manifest saved under
+    other settings is ignored, and save() deletes its outputs that weren't
+    written again.
+    """
+
+    def __init__(self, clean_folder: str, settings: dict):
+        self.clean_folder = clean_folder
+        self.path = os.path.join(clean_folder, MANIFEST_NAME)
+        self.settings = {'version': MANIFEST_VERSION, **settings}
+        self.entries = {}
+        self._stale_outputs = set()
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        if saved.get('settings') == self.settings:
+            self.entries = saved.get('files', {})
+        else:
+            self._stale_outputs = {output for entry in saved.get('files', {}).values()
+                                   for output in entry.get('outputs', [])}
+
+    def cached_records(self, file_path: str):
+        """
+        The saved records of an unchanged input, with absolute output paths,
+        or None if the input is new or changed or an output is missing.
+        """
+        entry = self.entries.get(os.path.basename(file_path))
+        if entry is None:
+            return None
+        stat = os.stat(file_path)
+        if (stat.st_size, stat.st_mtime_ns) != (entry['size'], entry['mtime_ns']):
+            if stat.st_size != entry['size'] or file_digest(file_path) != entry['sha256']:
+                return None
+            # Touched but not changed.
+            entry['mtime_ns'] = stat.st_mtime_ns
+        if not all(os.path.exists(os.path.join(self.clean_folder, name)) for name in entry['outputs']):
+            return None
+
+        records = [dict(record) for record in entry['records']]
+        for record in records:
+            if record.get('output_path'):
+                record['output_path'] = os.path.join(self.clean_folder, record['output_path'])
+        return records
+
+    def update(self, file_path: str, records: list, sheets: list = None):
+        """
+        Stores the records of a freshly cleaned input and deletes the outputs
+        its previous version wrote that it no longer writes. Inputs with an
+        error are left out so the next run tries them again.
+        """
+        name = os.path.basename(file_path)
+        old_outputs = set(self.entries.pop(name, {}).get('outputs', []))
+        outputs = []
+        for record in records:
+            if record.get('output_path'):
+                outputs.append(os.path.basename(record['output_path']))
+                side_file = os.path.splitext(record['output_path'])[0] + '_near_duplicates.csv'
+                if os.path.exists(side_file):
+                    outputs.append(os.path.basename(side_file))
+        for output in old_outputs - set(outputs):
+            _remove(os.path.join(self.clean_folder, output))
+        self._stale_outputs -= set(outputs)
+        if any(record['type'] == 'error' for record in records):
+            return
+
+        stat = os.stat(file_path)
+        self.entries[name] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_digest(file_path),
+            'sheets': sheets,
+            'outputs': outputs,
+            'records': [
+                {key: os.path.basename(value) if key == 'output_path' and value else value
+                 for key, value in record.items() if key != 'timings'}
+                for record in records
+            ],
+        }
+
+    def remove_missing(self, file_paths: list) -> list:
+        """Forgets inputs that are gone and deletes their outputs. Returns their names."""
+        present = {os.path.basename(file_path) for file_path in file_paths}
+        missing = [name for name in self.entries if name not in present]
+        for name in missing:
+            for output in self.entries.pop(name)['outputs']:
+                _remove(os.path.join(self.clean_folder, output))
+        return missing
+
+    def save(self):
+        """Writes the manifest atomically, after deleting the outputs of a discarded one."""
+        for output in self._stale_outputs:
+            _remove(os.path.join(self.clean_folder, output))
+        self._stale_outputs = set()
+        os.makedirs(self.clean_folder, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'settings': self.settings, 'files': self.entries}, f, indent=1, default=_json_value)
+        os.replace(tmp_path, self.path)
+
+
+def _json_value(value):
+    """JSON fallback for numpy scalars in the records."""
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
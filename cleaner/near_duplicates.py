@@ -0,0 +1,153 @@
+# cleaner/near_duplicates.py
+"""
+Near-duplicate company names, e.g. 'Acme Widgets' / 'Acme Widget' /
+'Acmewidgets', found without comparing every pair.
+
+1. Each name gets a compact key: lowercase, with everything except letters
+   and digits removed. Names with the same key are duplicates outright.
+2. Candidate pairs come from a sorted-neighbourhood index. The distinct keys
+   are sorted, forwards and reversed, and each key is paired with the next
+   WINDOW keys in both orders. So differences at the end ('widget' vs
+   'widgets') and at the start ('the acme' vs 'acme') both land next to
+   each other.
+3. A candidate pair matches when both keys hold the same digits (so
+   'Store 12' and 'Store 13' stay apart), their lengths are close and the
+   Dice similarity of their character bigrams is at least THRESHOLD.
+4. Matches are clustered with union-find. The first name of each cluster,
+   in input order, represents it (the canonical name). Chains of matches
+   can link names that are far apart, so each name is scored again against
+   the canonical name and only merged if it reaches THRESHOLD; the others
+   stay on their own. Merged names are dropped and the merge decisions,
+   with those scores, written to a side file.
+
+Keys are sorted twice and each key is compared with at most 2 * WINDOW
+others, so the cost grows as n log n in the number of distinct names.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from cleaner import sinks
+
+WINDOW = 4
+THRESHOLD = 0.9
+
+
+def compact_keys(names: pd.Series) -> pd.Series:
+    """'Acme Widgets, Inc' -> 'acmewidgetsinc'."""
+    return names.astype(str).str.lower().str.replace(r'[\W_]+', '', regex=True)
+
+
+def _bigrams(key: str) -> set:
+    return {key[i:i + 2] for i in range(len(key) - 1)} or {key}
+
+
+def dice_similarity(a: str, b: str) -> float:
+    """Dice coefficient of the character bigrams of two keys."""
+    bigrams_a, bigrams_b = _bigrams(a), _bigrams(b)
+    return 2 * len(bigrams_a & bigrams_b) / (len(bigrams_a) + len(bigrams_b))
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = np.arange(size)
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            # The smaller index (earlier name) stays the root.
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def _candidate_pairs(keys: np.ndarray, window: int):
+    """(i, j) index pairs of keys that are neighbours in forward or reversed order."""
+    reversed_keys = np.array([key[::-1] for key in keys], dtype=object)
+    for order in (np.argsort(keys, kind='stable'), np.argsort(reversed_keys, kind='stable')):
+        for offset in range(1, window + 1):
+            yield order[:-offset], order[offset:]
+
+
+def find_near_duplicates(names: pd.Series, threshold: float = THRESHOLD, window: int = WINDOW) -> pd.DataFrame:
+    """
+    Clusters the distinct names of a series. Returns one row per name that
+    was merged into another: value, canonical (the cluster's first name)
+    and similarity, the Dice score of their compact keys (1.0 for names
+    with the same key).
+    """
+    names = pd.Series(pd.unique(names.dropna().astype(str)), dtype=object)
+    empty = pd.DataFrame({'value': [], 'canonical': [], 'similarity': []})
+    if len(names) < 2:
+        return empty
+
+    # Step 1: names with the same compact key; work on distinct keys after that.
+    key_codes, keys = pd.factorize(compact_keys(names))
+    keys = keys.to_numpy(dtype=object)
+    first_name_of_key = pd.Series(np.arange(len(names))).groupby(key_codes).min().to_numpy()
+
+    lengths = np.fromiter((len(key) for key in keys), dtype=np.int64, count=len(keys))
+    digits = pd.Series(keys, dtype=object).str.replace(r'\D+', '', regex=True).to_numpy(dtype=object)
+
+    # Steps 2-3: only neighbours with the same digits and similar lengths are scored.
+    clusters = _UnionFind(len(keys))
+    max_length_ratio = (2 - threshold) / threshold
+    for left, right in _candidate_pairs(keys, window):
+        plausible = (digits[left] == digits[right]) & (
+            np.maximum(lengths[left], lengths[right]) <= max_length_ratio * np.minimum(lengths[left], lengths[right]))
+        for i, j in zip(left[plausible], right[plausible]):
+            if clusters.find(i) == clusters.find(j):
+                continue
+            if dice_similarity(keys[i], keys[j]) >= threshold:
+                clusters.union(i, j)
+
+    # Step 4: each key maps to the first name of its cluster, if it is close
+    # enough to that name's key; otherwise to its own first name.
+    key_roots = np.array([clusters.find(i) for i in range(len(keys))])
+    cluster_first = pd.Series(first_name_of_key).groupby(key_roots).transform('min').to_numpy(copy=True)
+    canonical_keys = key_codes[cluster_first]
+    key_scores = np.array([1.0 if k == c else dice_similarity(keys[k], keys[c])
+                           for k, c in enumerate(canonical_keys)])
+    too_far = key_scores < threshold
+    cluster_first[too_far] = first_name_of_key[too_far]
+    key_scores[too_far] = 1.0
+
+    canonical_position = cluster_first[key_codes]
+    merged = canonical_position != np.arange(len(names))
+    if not merged.any():
+        return empty
+
+    scores = key_scores[key_codes[merged]]
+    return pd.DataFrame({
+        'value': names[merged].to_numpy(),
+        'canonical': names.to_numpy()[canonical_position[merged]],
+        'similarity': scores.round(3),
+    })
+
+
+def collapse_clean_file(path: str, threshold: float = THRESHOLD, window: int = WINDOW) -> int:
+    """
+    Drops the near-duplicates from a cleaned names file, keeping the first
+    name of each cluster, and writes the merge decisions next to it as
+    '<file>_near_duplicates.csv'. Returns the number of names dropped.
+    """
+    chunks = list(sinks.read_values(path))
+    if not chunks:
+        return 0
+    names = pd.concat(chunks, ignore_index=True)
+    decisions = find_near_duplicates(names, threshold, window)
+    if decisions.empty:
+        return 0
+
+    decisions_path = os.path.splitext(path)[0] + '_near_duplicates.csv'
+    decisions.to_csv(decisions_path, index=False, encoding='utf-8-sig')
+    with sinks.open_sink(path, column='name') as sink:
+        sink.write(names[~names.isin(decisions['value'])].to_frame())
+    return len(decisions)
@@ -0,0 +1,135 @@
+# cleaner/profiling.py
+"""
+Per-stage timing for the cleaning pipeline (read, detect, clean, dedup,
+write and the optional near-duplicate pass).
+
+The processor wraps each stage in `with profiler.stage(name) as timing:`.
+A StageProfiler adds up wall time, rows and, optionally, the peak memory a
+stage allocated on top of what was live when it started. The default
+NULL_PROFILER does nothing, so a run that isn't profiled pays next to
+nothing.
+
+Memory is measured with tracemalloc, whose peak is shared by the whole
+process, so a run profiling memory holds tracing_memory() throughout and
+runs its stages one at a time.
+"""
+import contextlib
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+
+STAGES = ('read', 'detect', 'clean', 'dedup', 'write', 'near_dup')
+
+_memory_lock = threading.RLock()
+
+
+@dataclass
+class StageTiming:
+    """Totals of one stage for one file or sheet."""
+    file_name: str
+    stage: str
+    seconds: float = 0.0
+    rows: int = 0
+    peak_mib: float = None  # None unless memory is profiled
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class _Stage:
+    """One timed stage; set `rows` inside the with block."""
+    __slots__ = ('rows', '_profiler', '_name', '_started', '_memory_start')
+
+    def __init__(self, profiler, name):
+        self._profiler, self._name, self.rows = profiler, name, 0
+
+    def __enter__(self):
+        if self._profiler.memory:
+            tracemalloc.reset_peak()
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self._started
+        peak_mib = None
+        if self._profiler.memory:
+            peak_mib = (tracemalloc.get_traced_memory()[1] - self._memory_start) / 2 ** 20
+        self._profiler._add(self._name, seconds, self.rows, peak_mib)
+
+
+@contextlib.contextmanager
+def tracing_memory(enabled: bool = True):
+    """
+    Traces memory allocations for the block, for StageProfilers with
+    memory=True; tracing slows everything down, so it is stopped again
+    afterwards unless it was already on. Memory-profiled runs in one process
+    take turns, as they would reset each other's peaks.
+    """
+    if not enabled:
+        yield
+        return
+    with _memory_lock:
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            yield
+        finally:
+            if started:
+                tracemalloc.stop()
+
+
+class StageProfiler:
+    """
+    Collects stage totals for one file or sheet. With memory=True, the run
+    must be inside tracing_memory(); that slows it down, so memory is opt-in.
+    """
+
+    def __init__(self, file_name: str, memory: bool = False):
+        self.file_name = file_name
+        self.memory = memory
+        self._timings = {}
+
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    def _add(self, name, seconds, rows, peak_mib):
+        timing = self._timings.get(name)
+        if timing is None:
+            timing = self._timings[name] = StageTiming(self.file_name, name)
+        timing.seconds += seconds
+        timing.rows += int(rows)
+        if peak_mib is not None:
+            timing.peak_mib = max(timing.peak_mib or 0.0, peak_mib)
+
+    def timings(self) -> list:
+        """The stage totals in pipeline order."""
+        order = {name: i for i, name in enumerate(STAGES)}
+        return sorted(self._timings.values(), key=lambda t: order.get(t.stage, len(order)))
+
+
+class _NullStage:
+    __slots__ = ('rows',)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class _NullProfiler:
+    """Stands in for a StageProfiler when profiling is off."""
+    memory = False
+    _stage = _NullStage()
+
+    def stage(self, name: str) -> _NullStage:
+        return self._stage
+
+    def timings(self) -> list:
+        return []
+
+
+NULL_PROFILER = _NullProfiler()
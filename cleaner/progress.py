@@ -0,0 +1,116 @@
+# cleaner/progress.py
+"""
+Progress reporting and cooperative cancellation for long cleaning runs.
+
+The processor reports to a ProgressTracker after every chunk, sheet and
+file. The tracker keeps the running totals and passes a ProgressEvent to the
+caller's callback. Callbacks run on the processing thread, so a UI has to
+hand the events over to its own thread.
+"""
+import threading
+import time
+from dataclasses import dataclass
+
+
+class Cancelled(Exception):
+    """Raised inside a run when its CancelToken has been cancelled."""
+
+
+class CancelToken:
+    """A flag that another thread sets to stop a run between chunks."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+@dataclass
+class ProgressEvent:
+    """A snapshot of a run, sent after each step."""
+    stage: str                  # 'start', 'chunk', 'sheet', 'file' or 'done'
+    file_name: str = None
+    sheet_name: str = None
+    rows: int = 0               # rows read in this step
+    total_rows: int = 0         # rows read so far in the run
+    files_done: int = 0
+    files_total: int = 0
+    fraction: float = 0.0       # share of the input bytes handled, 0 to 1
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
+    eta_seconds: float = None   # None until there is something to go on
+
+
+class ProgressTracker:
+    """
+    Running totals for one run. Progress is measured in input bytes, since
+    row counts aren't known before a file is read; ETA extrapolates the
+    elapsed time over the bytes left.
+    """
+
+    def __init__(self, callback=None, cancel_token=None):
+        self.callback = callback
+        self.cancel_token = cancel_token
+        self.total_bytes = 0
+        self.bytes_done = 0
+        self.total_rows = 0
+        self.files_total = 0
+        self.files_done = 0
+        self._file_marks = (0, 0, 0)
+        self._started = time.perf_counter()
+
+    def start(self, total_bytes: int, files_total: int):
+        self.total_bytes, self.files_total = total_bytes, files_total
+        self._started = time.perf_counter()
+        self._emit('start')
+
+    def check_cancelled(self):
+        """Raises Cancelled if the run has been cancelled."""
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            raise Cancelled()
+
+    def update(self, stage: str, file_name: str = None, sheet_name: str = None, rows: int = 0,
+               bytes_done: int = 0, file_done: bool = False):
+        """Records a finished step: `rows` more rows read and `bytes_done` more input bytes handled."""
+        self.total_rows += int(rows)
+        self.bytes_done = min(self.bytes_done + bytes_done, self.total_bytes)
+        self.files_done += int(file_done)
+        self._emit(stage, file_name, sheet_name, rows)
+
+    def begin_file(self, size: int):
+        """Marks the start of a file of `size` bytes, for end_file()."""
+        self._file_marks = (size, self.bytes_done, self.total_rows)
+
+    def end_file(self, file_name: str, rows: int):
+        """
+        Records a finished file with `rows` rows in total. Bytes and rows not
+        already reported by its chunks or sheets are added now.
+        """
+        size, bytes_mark, rows_mark = self._file_marks
+        self.update('file', file_name,
+                    rows=max(rows - (self.total_rows - rows_mark), 0),
+                    bytes_done=max(size - (self.bytes_done - bytes_mark), 0),
+                    file_done=True)
+
+    def finish(self):
+        self.bytes_done = self.total_bytes
+        self._emit('done')
+
+    def _emit(self, stage, file_name=None, sheet_name=None, rows=0):
+        if self.callback is None:
+            return
+        elapsed = time.perf_counter() - self._started
+        fraction = self.bytes_done / self.total_bytes if self.total_bytes else float(stage == 'done')
+        eta = elapsed * (1 - fraction) / fraction if fraction > 0 else None
+        self.callback(ProgressEvent(
+            stage=stage, file_name=file_name, sheet_name=sheet_name, rows=int(rows),
+            total_rows=self.total_rows, files_done=self.files_done, files_total=self.files_total,
+            fraction=fraction, elapsed_seconds=elapsed,
+            rows_per_second=self.total_rows / elapsed if elapsed > 0 else 0.0,
+            eta_seconds=eta
+        ))
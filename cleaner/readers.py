@@ -0,0 +1,108 @@
+# cleaner/readers.py
+import numpy as np
+import pandas as pd
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+
+# openpyxl returns error cells as these strings; pandas reads them as NaN.
+_ERROR_CODES = frozenset(('#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A'))
+
+def _convert_cell(value):
+    """Converts an openpyxl cell value the way pandas.read_excel does."""
+    if value is None:
+        return ''
+    if isinstance(value, str) and value in _ERROR_CODES:
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def trim_rows(rows) -> list:
+    """
+    Collects a sheet's converted rows, dropping trailing empty cells and rows
+    and padding the rest to the same width, as pandas.read_excel does.
+    """
+    data = []
+    last_row_with_data = -1
+    for row_number, row in enumerate(rows):
+        row = list(row)
+        while row and row[-1] == '':
+            row.pop()
+        if row:
+            last_row_with_data = row_number
+        data.append(row)
+    data = data[:last_row_with_data + 1]
+
+    if data:
+        width = max(len(row) for row in data)
+        data = [row + [''] * (width - len(row)) for row in data]
+    return data
+
+def frame_from_rows(rows: list, header=0) -> pd.DataFrame:
+    """
+    Builds a DataFrame from raw sheet rows with the same parsing rules as
+    pandas.read_excel (NA strings, type inference, header de-duplication).
+    The rows are not modified, so one sheet can be parsed with and without
+    a header row without reading it again.
+    """
+    if not rows:
+        return pd.DataFrame()
+    try:
+        return TextParser(list(rows), header=header, skip_blank_lines=False).read()
+    except EmptyDataError:
+        return pd.DataFrame()
+
+class ExcelWorkbook:
+    """
+    A workbook opened once for the whole run over its sheets.
+    .xlsx files are streamed in openpyxl's read-only mode; other formats go
+    through a single pandas.ExcelFile. Use it as a context manager.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        if file_path.endswith('.xlsx'):
+            import openpyxl
+            self._book = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+            self.sheet_names = list(self._book.sheetnames)
+        else:
+            self._book = pd.ExcelFile(file_path)
+            self.sheet_names = list(self._book.sheet_names)
+
+    def sheets(self, sheet_names: list = None):
+        """
+        Yields (sheet_name, rows) for each sheet, or for `sheet_names` only,
+        where rows is a lazy iterator as returned by rows(). Sheets are read
+        one at a time, so at most the sheet being processed is in memory.
+        """
+        for sheet_name in sheet_names or self.sheet_names:
+            yield sheet_name, self.rows(sheet_name)
+
+    def rows(self, sheet_name):
+        """
+        Iterates over a sheet's rows with cells converted like pandas.read_excel
+        does, without trimming. .xlsx sheets are streamed row by row.
+        """
+        if isinstance(self._book, pd.ExcelFile):
+            df = self._book.parse(sheet_name, header=None, dtype=object, keep_default_na=False)
+            yield from df.replace({np.nan: ''}).values.tolist()
+            return
+        worksheet = self._book[sheet_name]
+        # Some writers store a wrong <dimension>, which would cut rows off.
+        worksheet.reset_dimensions()
+        for row in worksheet.iter_rows(values_only=True):
+            yield [_convert_cell(value) for value in row]
+
+    def close(self):
+        self._book.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def excel_sheet_names(file_path: str) -> list:
+    """Lists the sheets of a workbook without loading their data."""
+    with ExcelWorkbook(file_path) as workbook:
+        return workbook.sheet_names
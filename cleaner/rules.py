@@ -0,0 +1,221 @@
+# cleaner/rules.py
+"""
+The table-driven cleaning rules, an optional rules file to extend them and
+their compiled matchers.
+
+The tables are the name suffixes to remove, the special capitalizations,
+the extra multi-part domain suffixes, the header-like placeholder values
+and the header keywords of detection. The built-in tables are below. A
+rules file is JSON:
+
+    {
+      "format": 1,
+      "suffixes": ["Pty", "Oyj"],
+      "special_cases": {"Kpmg": "KPMG"},
+      "multi_part_suffixes": [".com.ng"],
+      "values_to_remove": ["n/a"],
+      "name_keywords": ["firm"],
+      "domain_keywords": ["homepage"]
+    }
+
+Its entries are added to the built-in tables. With "replace": true, the
+tables it has replace the built-in ones instead. Every table is optional.
+
+A RuleSet compiles its tables once. Suffixes and special cases become
+regexes built from a character trie, so matching costs the length of the
+name and not the number of entries. RuleSet.version hashes the tables; the
+clean cache and the incremental manifest are keyed on it.
+
+use_rules(path) makes a file's rules the active set of this process. Bulk
+runs pass the path to their worker processes in CleanOptions.rules_path.
+"""
+import functools
+import hashlib
+import json
+import os
+import re
+
+FORMAT_VERSION = 1
+
+# The definitive, expanded list of suffixes.
+DEFAULT_SUFFIXES = [
+    'Inc', 'Corp', 'Corporation', 'Incorporated', 'Company', 'Co', 'Technologies',
+    'Holdings', 'Group', 'Solutions', 'Services', 'Systems', 'Associates',
+    'LLC', 'Ltd', 'LLP', 'LP', 'PC', 'PLC', 'GmbH', 'AG', 'SARL', 'SA',
+    'AB', 'BV', 'SpA', 'Srl', 'SL', 'SA de CV', 'Platforms', 'Stores',
+    'Motors', 'Wholesale', 'Coffee', 'International', 'Service', 'Association',
+    'Business', 'Machines', 'Mbh', 'Ggmbh', 'Kg', 'UK'
+]
+
+# A dictionary for special capitalization cases that .title() gets wrong.
+DEFAULT_SPECIAL_CASES = {
+    'Jpmorgan': 'JPMorgan',
+    'Hp': 'HP',
+    'Ibm': 'IBM'
+}
+
+# Extra multi-part suffixes on top of the bundled public suffix snapshot
+# (see cleaner/suffixes.py).
+DEFAULT_MULTI_PART_SUFFIXES = {
+    '.co.uk', '.org.uk', '.com.au', '.net.au', '.com.sa', '.com.br',
+    '.com.mx', '.co.jp', '.co.za', '.co.in', '.com.cn', '.com.tw'
+}
+
+# Header-like placeholder values dropped before cleaning.
+DEFAULT_VALUES_TO_REMOVE = {
+    'company', 'account', 'account name', 'name', 'organization', 'customer',
+    'prospect', 'client', 'domain', 'company domain', 'website', 'url',
+    'website url', 'web address'
+}
+
+# Keyword sets for header detection.
+DEFAULT_NAME_KEYWORDS = {
+    'name', 'account', 'company', 'organization', 'customer', 'prospect', 'client'
+}
+DEFAULT_DOMAIN_KEYWORDS = {
+    'domain', 'website', 'url', 'web address'
+}
+
+# Table name -> whether it maps values (dict) rather than lists them.
+TABLES = {
+    'suffixes': False, 'special_cases': True, 'multi_part_suffixes': False,
+    'values_to_remove': False, 'name_keywords': False, 'domain_keywords': False,
+}
+
+
+def trie_pattern(words) -> str:
+    """
+    A regex alternation matching exactly `words`, factored into a character
+    trie ('Co', 'Corp', 'Corporation' -> 'Co(?:rp(?:oration)?)?'). At each
+    position the longest word wins, like an alternation sorted longest first.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = None
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        group = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' not in node:
+            return group
+        # A word ends here, but a longer one may go on; try that first.
+        return (group if len(branches) > 1 or len(branches[0]) == 1 else '(?:' + group + ')') + '?'
+
+    return build(trie)
+
+
+class RuleSet:
+    """
+    One set of rule tables (see TABLES) and the matchers compiled from them.
+    `source` names where it came from, for messages.
+    """
+
+    def __init__(self, tables: dict, source: str = 'built-in'):
+        unknown = set(tables) - set(TABLES)
+        if unknown:
+            raise ValueError(f"Unknown rule tables in {source}: {', '.join(sorted(unknown))}")
+        self.source = source
+        self.suffixes = list(tables['suffixes'])
+        self.special_cases = dict(tables['special_cases'])
+        self.multi_part_suffixes = set(tables['multi_part_suffixes'])
+        self.values_to_remove = {value.strip().lower() for value in tables['values_to_remove']}
+        # Headers are lowercased before they are matched against these.
+        self.name_keywords = {keyword.lower() for keyword in tables['name_keywords']}
+        self.domain_keywords = {keyword.lower() for keyword in tables['domain_keywords']}
+
+    def tables(self) -> dict:
+        """The tables in a canonical, JSON-ready form."""
+        return {
+            'suffixes': sorted(set(self.suffixes)),
+            'special_cases': dict(sorted(self.special_cases.items())),
+            'multi_part_suffixes': sorted(self.multi_part_suffixes),
+            'values_to_remove': sorted(self.values_to_remove),
+            'name_keywords': sorted(self.name_keywords),
+            'domain_keywords': sorted(self.domain_keywords),
+        }
+
+    @functools.cached_property
+    def version(self) -> str:
+        """Short hash of the tables."""
+        return hashlib.sha256(json.dumps(self.tables(), sort_keys=True).encode()).hexdigest()[:16]
+
+    @functools.cached_property
+    def suffix_pattern(self) -> str:
+        """Alternation of the suffixes, case-insensitive (compile with re.IGNORECASE)."""
+        return trie_pattern({suffix.lower() for suffix in self.suffixes})
+
+    @functools.cached_property
+    def special_case_pattern(self):
+        """Compiled regex of the special cases, or None if there are none."""
+        return re.compile(trie_pattern(self.special_cases)) if self.special_cases else None
+
+
+def default_rules() -> RuleSet:
+    """The built-in tables. They are read on each call, so edits to them count."""
+    return RuleSet({
+        'suffixes': DEFAULT_SUFFIXES,
+        'special_cases': DEFAULT_SPECIAL_CASES,
+        'multi_part_suffixes': DEFAULT_MULTI_PART_SUFFIXES,
+        'values_to_remove': DEFAULT_VALUES_TO_REMOVE,
+        'name_keywords': DEFAULT_NAME_KEYWORDS,
+        'domain_keywords': DEFAULT_DOMAIN_KEYWORDS,
+    })
+
+
+def load_rules(path: str) -> RuleSet:
+    """Reads a rules file (see the module docstring) on top of the built-in tables."""
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"{path}: a rules file holds a JSON object")
+    file_format = config.pop('format', FORMAT_VERSION)
+    if file_format != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported rules format {file_format!r} (expected {FORMAT_VERSION})")
+    replace = config.pop('replace', False)
+
+    tables = default_rules().tables()
+    for name, entries in config.items():
+        if name not in TABLES:
+            raise ValueError(f"{path}: unknown rule table '{name}'")
+        if not isinstance(entries, dict if TABLES[name] else list):
+            raise ValueError(f"{path}: '{name}' must be a JSON {'object' if TABLES[name] else 'array'}")
+        if replace:
+            tables[name] = entries
+        elif TABLES[name]:
+            tables[name] = {**tables[name], **entries}
+        else:
+            tables[name] = tables[name] + entries
+    return RuleSet(tables, source=path)
+
+
+_active = None
+_active_key = None
+
+
+def active_rules() -> RuleSet:
+    """The rule set cleaning uses in this process; the built-in one by default."""
+    global _active
+    if _active is None:
+        _active = default_rules()
+    return _active
+
+
+def use_rules(path: str = None) -> RuleSet:
+    """
+    Makes the rules file at `path` the active rule set, or the built-in
+    tables with None. Loading the same unchanged file again is free.
+    """
+    global _active, _active_key
+    key = None
+    if path is not None:
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key != _active_key or _active is None:
+        _active = load_rules(path) if path is not None else default_rules()
+        _active_key = key
+    return _active
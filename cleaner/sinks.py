@@ -0,0 +1,210 @@
+# cleaner/sinks.py
+"""
+Output sinks for the cleaned values: CSV (the default), Parquet, Arrow IPC
+and XLSX.
+
+A sink is opened on the final path, takes frames one at a time with
+write(), and only puts the file in place on close(): everything goes to
+'<path>.tmp', which is then renamed over the path. A run that fails or is
+cancelled calls abort() and leaves any earlier output untouched.
+
+    with open_sink(path, 'parquet', 'name') as sink:
+        for chunk in chunks:
+            sink.write(chunk)
+
+CSV keeps the old layout: one column, no header, UTF-8 with a BOM. The
+columnar formats store one string column named after the value type.
+Parquet and Arrow need pyarrow, which is only imported when one of them is
+used. XLSX is written with openpyxl in write-only mode and starts a new
+sheet every XLSX_MAX_ROWS rows. Its cells are always text, so a value like
+'=1+1' is not a formula, and characters Excel can't store are dropped.
+
+read_values() reads any of the formats back in chunks, for the passes that
+rewrite a cleaned file (near-duplicates, folder-wide dedup).
+"""
+import os
+
+import pandas as pd
+
+FORMATS = ('csv', 'parquet', 'arrow', 'xlsx')
+EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow', 'xlsx': '.xlsx'}
+# Rows per sheet; Excel stops at 1,048,576.
+XLSX_MAX_ROWS = 1_000_000
+
+
+def format_of(path: str) -> str:
+    """The sink format a cleaned file was written in, from its extension."""
+    extension = os.path.splitext(path)[1].lower()
+    for fmt, fmt_extension in EXTENSIONS.items():
+        if extension == fmt_extension:
+            return fmt
+    raise ValueError(f"Not a cleaned output file: {path}")
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet and Arrow output need pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+class _Sink:
+    def __init__(self, path: str, column: str):
+        self.path = path
+        self.column = column
+        self.tmp_path = path + '.tmp'
+        self.rows = 0
+
+    def write(self, frame: pd.DataFrame):
+        """Appends the first column of a frame."""
+        values = frame.iloc[:, 0]
+        self._write(values)
+        self.rows += len(values)
+
+    def close(self):
+        self._close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        try:
+            self._close()
+        except Exception:
+            pass
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class CsvSink(_Sink):
+    def __init__(self, path: str, column: str):
+        super().__init__(path, column)
+        self._file = open(self.tmp_path, 'w', encoding='utf-8', newline='')
+
+    def _write(self, values):
+        if values.empty:
+            return
+        if not self.rows:
+            # Like to_csv(encoding='utf-8-sig'): the BOM comes with the first row.
+            self._file.write('\ufeff')
+        values.to_frame().to_csv(self._file, index=False, header=False)
+
+    def _close(self):
+        self._file.close()
+
+
+class _ArrowSink(_Sink):
+    def __init__(self, path: str, column: str):
+        super().__init__(path, column)
+        self._pa = _import_pyarrow()
+        self._schema = self._pa.schema([(column, self._pa.string())])
+        self._writer = self._open_writer()
+
+    def _write(self, values):
+        if getattr(values.dtype, 'storage', None) == 'pyarrow':
+            # Arrow-backed strings are handed over without going through Python objects.
+            array = self._pa.array(values.array).cast(self._pa.string())
+        else:
+            array = self._pa.array(values.astype(object).where(values.notna(), None), type=self._pa.string())
+        self._writer.write_table(self._pa.Table.from_arrays([array], schema=self._schema))
+
+    def _close(self):
+        self._writer.close()
+
+
+class ParquetSink(_ArrowSink):
+    def _open_writer(self):
+        return self._pa.parquet.ParquetWriter(self.tmp_path, self._schema)
+
+
+class ArrowSink(_ArrowSink):
+    def _open_writer(self):
+        return self._pa.ipc.new_file(self.tmp_path, self._schema)
+
+
+class XlsxSink(_Sink):
+    def __init__(self, path: str, column: str):
+        super().__init__(path, column)
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+        self._workbook = openpyxl.Workbook(write_only=True)
+        self._sheet = None
+        self._cell = WriteOnlyCell
+        self._illegal = ILLEGAL_CHARACTERS_RE
+
+    def _text_cell(self, value):
+        cell = self._cell(self._sheet, value=self._illegal.sub('', str(value)))
+        cell.data_type = 's'
+        return cell
+
+    def _write(self, values):
+        for value in values.astype(object).where(values.notna(), None):
+            if self._sheet is None or self._sheet_rows == XLSX_MAX_ROWS:
+                self._sheet = self._workbook.create_sheet()
+                self._sheet_rows = 0
+            self._sheet.append([None if value is None else self._text_cell(value)])
+            self._sheet_rows += 1
+
+    def _close(self):
+        if self._sheet is None:
+            self._workbook.create_sheet()
+        self._workbook.save(self.tmp_path)
+
+
+SINKS = {'csv': CsvSink, 'parquet': ParquetSink, 'arrow': ArrowSink, 'xlsx': XlsxSink}
+
+
+def open_sink(path: str, fmt: str = None, column: str = 'value') -> _Sink:
+    """A sink for `path`; the format defaults to the one its extension names."""
+    return SINKS[fmt or format_of(path)](path, column)
+
+
+def read_values(path: str, chunksize: int = 1_000_000):
+    """
+    Yields the values of a cleaned file as string series of up to
+    `chunksize` rows. Blank values come back as ''.
+    """
+    fmt = format_of(path)
+    if fmt == 'csv':
+        try:
+            with pd.read_csv(path, header=None, dtype=str, keep_default_na=False, skip_blank_lines=False,
+                             encoding='utf-8-sig', chunksize=chunksize) as chunks:
+                for chunk in chunks:
+                    yield chunk[0]
+        except pd.errors.EmptyDataError:
+            return
+    elif fmt == 'xlsx':
+        import openpyxl
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        try:
+            values = []
+            for sheet in workbook.worksheets:
+                for (value,) in sheet.iter_rows(values_only=True, max_col=1):
+                    values.append('' if value is None else str(value))
+                    if len(values) == chunksize:
+                        yield pd.Series(values, dtype=object)
+                        values = []
+            if values:
+                yield pd.Series(values, dtype=object)
+        finally:
+            workbook.close()
+    else:
+        pa = _import_pyarrow()
+        if fmt == 'parquet':
+            batches = pa.parquet.ParquetFile(path).iter_batches(batch_size=chunksize)
+        else:
+            reader = pa.ipc.open_file(path)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        for batch in batches:
+            yield pd.Series(batch.column(0).to_pylist(), dtype=object).fillna('')
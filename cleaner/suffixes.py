@@ -0,0 +1,175 @@
+# cleaner/suffixes.py
+"""
+Offline public-suffix index used by clean_domains to find root domains.
+
+The rules come from a bundled snapshot of the ICANN section of the Public
+Suffix List (cleaner/data/public_suffix_list.dat); nothing is fetched from
+the network. To update it, regenerate the snapshot from a local copy of the
+list:
+
+    python -m cleaner.suffixes path/to/public_suffix_list.dat
+
+Without a path, the snapshot that ships inside the tldextract package is used.
+"""
+import argparse
+import functools
+import hashlib
+import os
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), 'data', 'public_suffix_list.dat')
+
+_ICANN_END = '===END ICANN DOMAINS==='
+
+
+class SuffixIndex:
+    """
+    Public-suffix rules compiled into hashed tables keyed by label count.
+
+    Every rule is stored reversed ('co.uk' -> 'ku.oc'), so the rules matching a
+    host are found by reversing it and looking up its first 1, 2, 3... labels.
+    Each lookup is a single set membership test, whatever the size of the list.
+    - rules:      plain rules, e.g. 'co.uk'
+    - wildcards:  parents of '*.' rules, e.g. 'ck' for '*.ck'
+    - exceptions: names of '!' rules, e.g. 'www.ck' for '!www.ck'
+    - prefixes:   every leading label path of any rule, used to stop walking
+                  as soon as no deeper rule can match
+    """
+
+    def __init__(self, rules, version=''):
+        self.rules, self.wildcards, self.exceptions, self.prefixes = {}, {}, {}, {}
+        self.version = version
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule: str):
+        rule = rule.strip().strip('.').lower()
+        if not rule:
+            return
+        if rule.startswith('!'):
+            table, rule = self.exceptions, rule[1:]
+        elif rule.startswith('*.'):
+            table, rule = self.wildcards, rule[2:]
+        else:
+            table = self.rules
+        labels = rule.split('.')
+        table.setdefault(len(labels), set()).add(rule[::-1])
+        for depth in range(1, len(labels) + 1):
+            self.prefixes.setdefault(depth, set()).add('.'.join(labels[-depth:])[::-1])
+
+    @property
+    def max_depth(self) -> int:
+        return max(self.prefixes, default=0)
+
+    def suffix_length(self, labels: list) -> int:
+        """
+        Number of trailing labels that form the public suffix of a host split
+        on '.'. Unknown TLDs count as a one-label suffix (the implicit '*' rule).
+        """
+        length, parent = 1, None
+        for depth in range(1, min(len(labels), self.max_depth + 1) + 1):
+            head = '.'.join(labels[-depth:])[::-1]
+            if head in self.exceptions.get(depth, ()):
+                # Exception rules prevail over every other match.
+                return depth - 1
+            if head in self.rules.get(depth, ()) or parent in self.wildcards.get(depth - 1, ()):
+                length = depth
+            if head not in self.prefixes.get(depth, ()):
+                break
+            parent = head
+        return length
+
+
+def _read_rules(path: str):
+    """Yields the ICANN rules of a file in Public Suffix List format."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if _ICANN_END in line:
+                break
+            if line and not line.startswith('//'):
+                yield line.split()[0]
+
+
+def _read_version(path: str) -> str:
+    """The '// VERSION:' header of a snapshot, or a hash of its content."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('// VERSION:'):
+                return line.split(':', 1)[1].strip()
+            if line.strip() and not line.startswith('//'):
+                break
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+@functools.lru_cache(maxsize=None)
+def load_suffix_index(path: str = SNAPSHOT_PATH) -> SuffixIndex:
+    """Compiles a suffix list file into a SuffixIndex. Loaded once per path."""
+    return SuffixIndex(_read_rules(path), version=_read_version(path))
+
+
+def _punycode(rule: str):
+    """The ASCII form of an internationalized rule, or None if it is ASCII already."""
+    if rule.isascii():
+        return None
+    prefix = ''
+    for marker in ('!', '*.'):
+        if rule.startswith(marker):
+            prefix, rule = marker, rule[len(marker):]
+    try:
+        return prefix + '.'.join(label.encode('idna').decode('ascii') for label in rule.split('.'))
+    except UnicodeError:
+        return None
+
+
+def _default_source() -> str:
+    """The public suffix list bundled with tldextract."""
+    import tldextract
+    return os.path.join(os.path.dirname(tldextract.__file__), '.tld_set_snapshot')
+
+
+def regenerate_snapshot(source_path: str = None, target_path: str = SNAPSHOT_PATH) -> str:
+    """
+    Rewrites the bundled snapshot from a local Public Suffix List file.
+    Keeps the ICANN section only and adds the punycode form of every
+    internationalized rule. Returns the version of the new snapshot.
+    """
+    source_path = source_path or _default_source()
+    header = []
+    with open(source_path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip() and not line.startswith('//'):
+                break
+            if line.startswith(('// VERSION:', '// COMMIT:')):
+                header.append(line.rstrip('\n'))
+
+    rules = []
+    for rule in _read_rules(source_path):
+        rules.append(rule)
+        ascii_rule = _punycode(rule)
+        if ascii_rule:
+            rules.append(ascii_rule)
+
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    tmp_path = target_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write('// ICANN section of the Public Suffix List, https://publicsuffix.org/list/\n')
+        f.write('// Subject to the Mozilla Public License, v. 2.0: https://mozilla.org/MPL/2.0/\n')
+        f.write('// Regenerate with: python -m cleaner.suffixes path/to/public_suffix_list.dat\n')
+        for line in header:
+            f.write(line + '\n')
+        f.write('\n')
+        for rule in dict.fromkeys(rules):
+            f.write(rule + '\n')
+    os.replace(tmp_path, target_path)
+    load_suffix_index.cache_clear()
+    return _read_version(target_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Regenerate the bundled public suffix snapshot.')
+    parser.add_argument('source', nargs='?', help="local public_suffix_list.dat (default: tldextract's copy)")
+    parser.add_argument('--output', default=SNAPSHOT_PATH, help='snapshot file to write')
+    args = parser.parse_args()
+    version = regenerate_snapshot(args.source, args.output)
+    print(f"Public suffix snapshot {version} written to {args.output}")
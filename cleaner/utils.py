@@ -1,8 +1,19 @@
 # cleaner/utils.py
 import os
+from copy import copy
+import numpy as np
 import pandas as pd
-import openpyxl
-from openpyxl.styles import Border, Side, Font
+from cleaner import sinks
+
+# String dtype of the opt-in Arrow mode (see CleanOptions.arrow_strings): the
+# values of a column live in one UTF-8 buffer with offsets, instead of one
+# Python object per row. Needs pyarrow.
+ARROW_STRING = 'string[pyarrow]'
+
+def is_arrow_string(values) -> bool:
+    """Whether a series holds ARROW_STRING values; the cleaners then return the same dtype."""
+    dtype = values.dtype
+    return isinstance(dtype, pd.StringDtype) and dtype.storage == 'pyarrow' and dtype.na_value is pd.NA
 
 def _is_likely_domain(s) -> bool:
     """
@@ -32,65 +43,181 @@ def _is_likely_domain(s) -> bool:
 
     return True
 
-def save_clean_file(original_path: str, df: pd.DataFrame, col_type: str, make_new_folder: bool = False, sheet_name: str = None):
+# What str.strip() removes from ASCII text, for the Arrow path.
+_ASCII_WHITESPACE = ' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f'
+
+def likely_domain_mask(values) -> np.ndarray:
     """
-    Save cleaned DataFrame to CSV with a dynamic name based on content type and sheet name.
+    _is_likely_domain over a whole column (a series or an array) in one call,
+    as a boolean array. Values without a '.' are never domains, so only the
+    others are checked. Arrow-backed strings are checked with pyarrow's
+    string kernels when they are ASCII, without making Python strings; any
+    other values go through _is_likely_domain. Results are the same either way.
+    """
+    values = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    if getattr(values.dtype, 'storage', None) == 'pyarrow':
+        return _likely_domain_mask_arrow(values)
+    return np.fromiter((isinstance(s, str) and '.' in s and _is_likely_domain(s) for s in values),
+                       dtype=bool, count=len(values))
+
+def _after_last(strings, separator):
+    """The part of each string after the last separator; the whole string if there is none."""
+    import pyarrow.compute as pc
+    parts = pc.split_pattern(strings, separator, max_splits=1, reverse=True)
+    return pc.take(pc.list_flatten(parts), pc.subtract(parts.offsets[1:], 1))
+
+def _likely_domain_mask_arrow(values: pd.Series) -> np.ndarray:
+    """likely_domain_mask for Arrow-backed strings."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    strings = pa.array(values.array)
+    if isinstance(strings, pa.ChunkedArray):
+        strings = strings.combine_chunks()
+    mask = np.zeros(len(strings), dtype=bool)
+    ascii_only = pc.fill_null(pc.string_is_ascii(strings), False).to_numpy(zero_copy_only=False)
+    has_dot = pc.fill_null(pc.match_substring(strings, '.'), False).to_numpy(zero_copy_only=False)
+
+    # The same steps as _is_likely_domain, on whole columns.
+    positions = np.flatnonzero(ascii_only & has_dot)
+    hosts = pc.ascii_lower(pc.ascii_trim(strings.take(positions), _ASCII_WHITESPACE))
+    # Everything after the first '://', then up to the first '/'.
+    after_scheme = pc.split_pattern(hosts, '://', max_splits=1)
+    hosts = pc.take(pc.list_flatten(after_scheme), pc.subtract(after_scheme.offsets[1:], 1))
+    domain_parts = pc.list_element(pc.split_pattern(hosts, '/', max_splits=1), 0)
+    tlds = _after_last(domain_parts, '.')
+    tld_lengths = pc.utf8_length(tlds)
+    likely = pc.and_(
+        pc.and_(pc.invert(pc.match_substring(domain_parts, ' ')), pc.match_substring(domain_parts, '.')),
+        pc.and_(pc.and_(pc.greater_equal(tld_lengths, 2), pc.less_equal(tld_lengths, 6)), pc.ascii_is_alpha(tlds)))
+    mask[positions] = likely.to_numpy(zero_copy_only=False)
+
+    # Non-ASCII text follows Python's rules for whitespace, case and letters.
+    others = np.flatnonzero(~ascii_only & has_dot)
+    mask[others] = [_is_likely_domain(s) for s in strings.take(others).to_pylist()]
+    return mask
+
+def _clean_distinct(values: pd.Series, clean_values, cache=None, kind: str = None, version: str = None) -> np.ndarray:
+    """
+    Cleans each distinct value once and broadcasts the results back to every row.
+    `values` must not contain missing values; they are compared as strings, and
+    `clean_values` receives a series of the distinct strings in first-seen order.
+    With a CleanCache, only the distinct values it doesn't hold under
+    (kind, version) are cleaned. Returns an array aligned with `values`; an
+    ARROW_STRING array if `values` are ARROW_STRING.
+    """
+    compact = is_arrow_string(values)
+    codes, uniques = pd.factorize(values if compact else values.astype(str))
+    # Arrow-backed values are handed on as they are, so a cleaner that can
+    # work on the Arrow buffers doesn't need Python strings at all.
+    uniques = pd.Series(uniques, dtype=ARROW_STRING if compact else object)
+    if cache is None:
+        cleaned = clean_values(uniques)
+        cleaned = cleaned.array if compact else cleaned.to_numpy(dtype=object)
+    else:
+        cleaned = cache.clean(kind, version, uniques, clean_values)
+    if compact:
+        return pd.array(cleaned, dtype=ARROW_STRING).take(codes)
+    return cleaned[codes]
+
+def clean_file_path(original_path: str, col_type: str, make_new_folder: bool = False, sheet_name: str = None,
+                    fmt: str = 'csv') -> str:
+    """
+    Path of the cleaned file for a file (and sheet), named after its content
+    type, with the extension of the output format.
+    Creates the 'clean_companies' folder if requested.
     """
     folder = os.path.dirname(original_path)
     original_filename = os.path.basename(original_path)
     name, ext = os.path.splitext(original_filename)
 
+    extension = sinks.EXTENSIONS[fmt]
     if sheet_name:
-        new_name = f"{name}_{sheet_name}_clean_{col_type}.csv"
+        new_name = f"{name}_{sheet_name}_clean_{col_type}{extension}"
     else:
-        new_name = f"{name}_clean_{col_type}.csv"
+        new_name = f"{name}_clean_{col_type}{extension}"
 
     if make_new_folder:
         clean_folder = os.path.join(folder, 'clean_companies')
         os.makedirs(clean_folder, exist_ok=True)
-        save_path = os.path.join(clean_folder, new_name)
-    else:
-        save_path = os.path.join(folder, new_name)
-        
-    df.to_csv(save_path, index=False, header=False, encoding='utf-8-sig')
-    print(f"Saved cleaned file: {save_path}")
+        return os.path.join(clean_folder, new_name)
+    return os.path.join(folder, new_name)
 
-def format_tal_info_sheet(file_path: str):
+def open_clean_file(original_path: str, col_type: str, make_new_folder: bool = False, sheet_name: str = None,
+                    fmt: str = 'csv'):
     """
-    Applies advanced formatting to the tal_info.xlsx report.
-    - Auto-fits column widths.
-    - Adds borders to all cells with data.
-    - Hides gridlines.
+    Opens an output sink (see cleaner.sinks) for a file's cleaned values, for
+    writing them chunk by chunk. The file only appears once the sink is closed.
     """
-    workbook = openpyxl.load_workbook(file_path)
-    worksheet = workbook.active
-    
-    # Define the border style
-    thin_border = Border(left=Side(style='thin'), 
-                         right=Side(style='thin'), 
-                         top=Side(style='thin'), 
-                         bottom=Side(style='thin'))
-    
-    # Auto-fit columns and apply borders
-    for col in worksheet.columns:
-        max_length = 0
-        column = col[0].column_letter # Get the column name
-        for cell in col:
-            # Apply border to any cell with a value
-            if cell.value:
-                cell.border = thin_border
-            # Find the max length for column width
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        # Set column width with a little extra padding
-        adjusted_width = (max_length + 2)
-        worksheet.column_dimensions[column].width = adjusted_width
-
-    # Hide gridlines
-    worksheet.sheet_view.showGridLines = False
-
-    # Save the changes
-    workbook.save(file_path)
\ No newline at end of file
+    save_path = clean_file_path(original_path, col_type, make_new_folder=make_new_folder, sheet_name=sheet_name,
+                                fmt=fmt)
+    return sinks.open_sink(save_path, fmt, column=col_type)
+
+def save_clean_file(original_path: str, df: pd.DataFrame, col_type: str, make_new_folder: bool = False, sheet_name: str = None, fmt: str = 'csv') -> str:
+    """
+    Save cleaned DataFrame with a dynamic name based on content type and sheet name,
+    as CSV or another sink format. Returns the path written to.
+    """
+    with open_clean_file(original_path, col_type, make_new_folder, sheet_name, fmt) as sink:
+        sink.write(df)
+    print(f"Saved cleaned file: {sink.path}")
+    return sink.path
+
+def _cell_text(value) -> str:
+    return '' if value is None else str(value)
+
+def write_tal_info_workbook(file_path: str, sheets: list):
+    """
+    Writes the tal_info.xlsx report in a single streaming pass. `sheets` is a
+    list of (title, header, rows), rows being lists of plain values with None
+    for blanks. Every sheet is formatted as it is written:
+    - Column widths fit the longest value.
+    - Headers are bold and every cell with data has a border.
+    - Gridlines are hidden.
+    """
+    # Imported here so that loading the cleaners doesn't pull in openpyxl.
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+    from openpyxl.utils import get_column_letter
+
+    thin = Side(style='thin')
+    thin_border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    header_font = Font(bold=True)
+    header_alignment = Alignment(horizontal='center', vertical='top')
+
+    workbook = openpyxl.Workbook(write_only=True)
+    for title, header, rows in sheets:
+        worksheet = workbook.create_sheet(title)
+        worksheet.sheet_view.showGridLines = False
+        # Write-only sheets need their widths before the first row.
+        widths = [len(_cell_text(name)) for name in header]
+        for row in rows:
+            for i, value in enumerate(row):
+                widths[i] = max(widths[i], len(_cell_text(value)))
+        for i, width in enumerate(widths, start=1):
+            worksheet.column_dimensions[get_column_letter(i)].width = width + 2
+
+        # Styles are set once on a template and their style ids copied to each
+        # cell; assigning a Border per cell hashes it every time.
+        header_style = WriteOnlyCell(worksheet)
+        header_style.font, header_style.border, header_style.alignment = header_font, thin_border, header_alignment
+        bordered = WriteOnlyCell(worksheet)
+        bordered.border = thin_border
+
+        header_cells = []
+        for name in header:
+            cell = WriteOnlyCell(worksheet, value=name)
+            cell._style = copy(header_style._style)
+            header_cells.append(cell)
+        worksheet.append(header_cells)
+        for row in rows:
+            cells = []
+            for value in row:
+                if value is None or value == '':
+                    cells.append(value)
+                    continue
+                cell = WriteOnlyCell(worksheet, value=value)
+                cell._style = copy(bordered._style)
+                cells.append(cell)
+            worksheet.append(cells)
+    workbook.save(file_path)
@@ -0,0 +1,163 @@
+# cli.py
+"""
+Command line entry point for cleaning TALs without the window, e.g. from
+scheduled jobs:
+
+    python -m cli path/to/tal.xlsx
+    python -m cli path/to/folder --report --workers 4
+
+Prints one JSON document with the tal_info records to stdout (or --output);
+the cleaning messages go to stderr. Exit codes: 0 when everything was
+cleaned, 1 when a file or sheet failed, 2 for bad arguments.
+
+Only the standard library is loaded at startup. tkinter is never imported
+and pandas is only imported once there is something to clean; see
+benchmarks/startup.py for the startup budget.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+# Standard library only, like this module.
+from cleaner.manifest import _json_value
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='tal-cleaner', description='Clean TAL files without the UI.')
+    parser.add_argument('path', help='a CSV/Excel file, or a folder of them')
+    parser.add_argument('--report', action='store_true', help='also save tal_info.xlsx')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='processes for a folder (default: one per CPU)')
+    parser.add_argument('--csv-chunksize', type=int, default=None,
+                        help='rows per chunk when streaming CSVs (0 never streams)')
+    parser.add_argument('--shards', type=int, default=0,
+                        help='split each CSV of 64 MiB or more into this many parts cleaned in parallel processes')
+    parser.add_argument('--dedup-across-files', action='store_true',
+                        help='for a folder, keep each value only in the first file or sheet that has it')
+    parser.add_argument('--incremental', action='store_true',
+                        help='for a folder, only clean files that are new or changed since the last --incremental run')
+    parser.add_argument('--output-format', choices=('csv', 'parquet', 'arrow', 'xlsx'), default='csv',
+                        help='format of the cleaned files (parquet and arrow need pyarrow)')
+    parser.add_argument('--arrow-strings', action='store_true',
+                        help='carry values as compact Arrow-backed strings (less memory on big inputs; needs pyarrow)')
+    parser.add_argument('--merge-near-duplicates', action='store_true',
+                        help="drop near-duplicate names ('Acme Widget' / 'Acme Widgets') and list the merges")
+    parser.add_argument('--rules', metavar='FILE',
+                        help='JSON file extending the suffix, special-case, placeholder and keyword tables')
+    parser.add_argument('--cache', metavar='FILE',
+                        help='SQLite file that keeps cleaned values between runs, so repeated values skip cleaning')
+    parser.add_argument('--profile', action='store_true',
+                        help='time each stage; adds timings to the records and a Timings sheet to the report')
+    parser.add_argument('--profile-memory', action='store_true', help='also record peak memory per stage (slower)')
+    parser.add_argument('--output', help='write the JSON result to this file instead of stdout')
+    return parser
+
+
+@contextlib.contextmanager
+def _stdout_to_stderr():
+    """
+    Sends everything printed while cleaning, worker processes included, to
+    stderr so that stdout only carries the JSON result.
+    """
+    try:
+        stdout_fd, stderr_fd = sys.stdout.fileno(), sys.stderr.fileno()
+    except (AttributeError, OSError, ValueError):
+        # No real stdout, e.g. a windowed build.
+        yield
+        return
+    sys.stdout.flush()
+    saved_fd = os.dup(stdout_fd)
+    os.dup2(stderr_fd, stdout_fd)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved_fd, stdout_fd)
+        os.close(saved_fd)
+
+
+def clean_path(path, generate_report, options=None, workers=1, dedup_across_files=False, incremental=False,
+               on_progress=None, cancel_token=None) -> dict:
+    """
+    Cleans a file or folder and returns the result document (see the module
+    docstring). A file that fails becomes an error record; Cancelled is
+    raised as is. Shared with the daemon.
+    """
+    import processor
+
+    path = os.path.abspath(path)
+    started = time.perf_counter()
+    if os.path.isdir(path):
+        mode = 'folder'
+        records = processor.process_folder(path, generate_report, workers=workers, options=options,
+                                           on_progress=on_progress, cancel_token=cancel_token,
+                                           dedup_across_files=dedup_across_files, incremental=incremental)
+    else:
+        mode = 'file'
+        try:
+            records = processor.process_single_file(path, generate_report, options=options,
+                                                    on_progress=on_progress, cancel_token=cancel_token)
+        except processor.Cancelled:
+            raise
+        except Exception as e:
+            records = [processor._error_record(path, None, e)]
+
+    return {
+        'path': path,
+        'mode': mode,
+        'records': records,
+        'failed': sum(1 for record in records if record['type'] == 'error'),
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def check_path(path: str):
+    """The reason `path` can't be cleaned, or None if it can."""
+    if not os.path.exists(path):
+        return f"no such file or folder: {path}"
+    if os.path.isfile(path) and not path.endswith(('.csv', '.xls', '.xlsx')):
+        return f"not a CSV or Excel file: {path}"
+    return None
+
+
+def run(args) -> tuple:
+    """Cleans args.path. Returns (result, exit_code)."""
+    import processor
+
+    options = processor.CleanOptions(csv_chunksize=args.csv_chunksize, profile=args.profile,
+                                     profile_memory=args.profile_memory,
+                                     merge_near_duplicates=args.merge_near_duplicates, cache_path=args.cache,
+                                     output_format=args.output_format, arrow_strings=args.arrow_strings,
+                                     rules_path=args.rules, csv_shards=args.shards)
+    with _stdout_to_stderr():
+        result = clean_path(args.path, args.report, options, workers=args.workers or os.cpu_count(),
+                            dedup_across_files=args.dedup_across_files, incremental=args.incremental)
+    return result, EXIT_FAILED if result['failed'] else EXIT_OK
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    problem = check_path(args.path)
+    if problem:
+        parser.error(problem)
+
+    result, exit_code = run(args)
+    text = json.dumps(result, default=_json_value, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
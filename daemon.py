@@ -0,0 +1,363 @@
+# daemon.py
+"""
+Long-lived local cleaning daemon, for clients that submit many small TALs.
+It loads pandas, the cleaners and their compiled rules once, so a job on a
+small file costs milliseconds instead of a fresh interpreter's seconds.
+
+    python -m daemon serve --port 8765 --workers 2
+    python -m daemon submit path/to/tal.xlsx --report --port 8765
+    python -m daemon stop --port 8765
+
+The daemon only listens on 127.0.0.1. Clients send one JSON object per
+line and get JSON lines back on the same connection:
+
+    {"token": "...", "path": "C:/tals/acme.xlsx", "report": true,
+     "progress": true, "options": {"output_format": "parquet"}, "id": "anything"}
+
+    {"event": "queued", "job": 1, "id": "anything"}
+    {"event": "started", "job": 1, "id": "anything"}
+    {"event": "progress", "job": 1, "stage": "sheet", "fraction": 0.5, ...}
+    {"event": "done", "job": 1, "path": ..., "records": [...], "failed": 0, ...}
+
+"done" carries the same document `python -m cli` prints. A job ends with
+"done", "cancelled" or "error"; "progress" events (see
+cleaner.progress.ProgressEvent) only come when asked for. "options" takes
+the CleanOptions fields, and "workers", "dedup_across_files" and
+"incremental" apply to folders. The rules file is fixed when the daemon
+starts, since the active rule set is shared by the whole process.
+
+Other requests: {"command": "ping"}, {"command": "cancel", "job": 1} and
+{"command": "shutdown"}. Closing a connection cancels its unfinished jobs.
+
+Every request carries the token `serve` writes to a file only the user can
+read (see token_path()), so other local programs, and web pages posting to
+the port, can't use the daemon. A line that isn't a JSON object, or has a
+wrong token, gets an error and the connection is closed.
+
+Jobs run on a pool of `workers` threads and up to `max_queued` more wait
+for one; beyond that a job is refused with {"event": "busy"}. Jobs on the
+same folder (or on files in one folder, which share tal_info.xlsx) run one
+after the other.
+"""
+import argparse
+import dataclasses
+import hmac
+import itertools
+import json
+import os
+import secrets
+import socket
+import socketserver
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cli
+from cleaner.manifest import _json_value
+from cleaner.progress import Cancelled, CancelToken
+
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUED = 32
+# Options a job can't set; see the module docstring.
+FIXED_OPTIONS = ('rules_path',)
+
+
+def token_path(port: int = DEFAULT_PORT) -> str:
+    """Where the daemon on `port` keeps its token."""
+    return os.path.join(os.path.expanduser('~'), '.tal_cleaner', f'daemon-{port}.token')
+
+
+def _write_token(path: str, token: str):
+    """Writes the token to a new file that only the user can read."""
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token)
+
+
+def read_token(port: int = DEFAULT_PORT, path: str = None) -> str:
+    with open(path or token_path(port), encoding='utf-8') as f:
+        return f.read().strip()
+
+
+def _message(event: str, **fields) -> bytes:
+    return (json.dumps({'event': event, **fields}, default=_json_value) + '\n').encode('utf-8')
+
+
+def warm_up(rules_path: str = None):
+    """Imports the cleaning stack and compiles its rules, so the first job doesn't pay for it."""
+    import openpyxl  # noqa: F401 (reports and Excel inputs)
+    import pandas as pd
+
+    import processor
+    from cleaner import clean_domains, clean_names, detect, rules
+
+    rules.use_rules(rules_path)
+    clean_names.clean_company_names(pd.Series(['Acme Widgets, Inc.', 'acme.com']))
+    clean_domains.clean_company_domains(pd.Series(['https://www.acme.co.uk/about']))
+    detect.find_target_column_and_type(pd.DataFrame({'Company Name': ['Acme Inc', 'Widget Co']}))
+    return processor
+
+
+class _Job:
+    def __init__(self, number, request, connection):
+        self.number = number
+        self.request = request
+        self.connection = connection
+        self.cancel_token = CancelToken()
+        self.tags = {'job': number, **({'id': request['id']} if 'id' in request else {})}
+
+
+class _Connection(socketserver.StreamRequestHandler):
+    """One client. Reads requests until it disconnects; job threads write back through send()."""
+
+    def setup(self):
+        super().setup()
+        self._send_lock = threading.Lock()
+        self.jobs = set()
+
+    def send(self, data: bytes):
+        with self._send_lock:
+            try:
+                self.wfile.write(data)
+                self.wfile.flush()
+            except OSError:
+                # The client went away; its jobs are cancelled in finish().
+                pass
+
+    def handle(self):
+        daemon = self.server.daemon
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError('a request is a JSON object')
+            except ValueError as e:
+                # Not a client of ours, e.g. an HTTP request: don't read any further.
+                self.send(_message('error', message=f"bad request: {e}"))
+                return
+            if not daemon.authorized(request.pop('token', None)):
+                self.send(_message('error', message='missing or wrong token'))
+                return
+            daemon.handle_request(request, self)
+
+    def finish(self):
+        for job in list(self.jobs):
+            job.cancel_token.cancel()
+        super().finish()
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class CleanerDaemon:
+    """
+    The daemon: a localhost server and a bounded pool of cleaning threads.
+    port=0 picks a free port; `address` has the one in use. A fresh token is
+    written to `token_file` (by default token_path() of the port) and
+    removed when the daemon stops.
+    """
+
+    def __init__(self, port: int = DEFAULT_PORT, workers: int = DEFAULT_WORKERS,
+                 max_queued: int = DEFAULT_MAX_QUEUED, rules_path: str = None, token_file: str = None):
+        self.processor = warm_up(rules_path)
+        self.rules_path = rules_path
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='clean-job')
+        self._slots = threading.BoundedSemaphore(workers + max_queued)
+        self._numbers = itertools.count(1)
+        self._jobs = {}
+        self._jobs_lock = threading.Lock()
+        self._folder_locks = {}
+        self._server = _Server(('127.0.0.1', port), _Connection)
+        self._server.daemon = self
+        self.token = secrets.token_urlsafe(32)
+        self.token_file = token_file or token_path(self.address[1])
+        _write_token(self.token_file, self.token)
+
+    @property
+    def address(self) -> tuple:
+        return self._server.server_address
+
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.token_file) and read_token(path=self.token_file) == self.token:
+                os.remove(self.token_file)
+            with self._jobs_lock:
+                for job in self._jobs.values():
+                    job.cancel_token.cancel()
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def shutdown(self):
+        """Stops serving; call from another thread than serve_forever()'s."""
+        self._server.shutdown()
+
+    def authorized(self, token) -> bool:
+        return isinstance(token, str) and hmac.compare_digest(token.encode(), self.token.encode())
+
+    def handle_request(self, request: dict, connection: _Connection):
+        command = request.get('command', 'clean')
+        if command == 'ping':
+            with self._jobs_lock:
+                running = len(self._jobs)
+            connection.send(_message('pong', pid=os.getpid(), jobs=running))
+        elif command == 'cancel':
+            with self._jobs_lock:
+                job = self._jobs.get(request.get('job'))
+            if job is None:
+                connection.send(_message('error', job=request.get('job'), message='no such job'))
+            else:
+                job.cancel_token.cancel()
+                connection.send(_message('cancelling', job=job.number))
+        elif command == 'shutdown':
+            connection.send(_message('stopping'))
+            threading.Thread(target=self.shutdown, daemon=True).start()
+        elif command == 'clean':
+            self._submit(request, connection)
+        else:
+            connection.send(_message('error', message=f"unknown command: {command}"))
+
+    def _submit(self, request: dict, connection: _Connection):
+        tags = {'id': request['id']} if 'id' in request else {}
+        problem = cli.check_path(request['path']) if isinstance(request.get('path'), str) else 'no path given'
+        if problem is None:
+            try:
+                request['options'] = self._options(request.get('options') or {})
+            except (TypeError, ValueError) as e:
+                problem = str(e)
+        if problem is not None:
+            connection.send(_message('error', message=problem, **tags))
+            return
+        if not self._slots.acquire(blocking=False):
+            connection.send(_message('busy', message='too many jobs queued; try again later', **tags))
+            return
+
+        job = _Job(next(self._numbers), request, connection)
+        with self._jobs_lock:
+            self._jobs[job.number] = job
+        connection.jobs.add(job)
+        connection.send(_message('queued', **job.tags))
+        self._pool.submit(self._run, job)
+
+    def _options(self, fields: dict):
+        """CleanOptions from a job's "options"."""
+        known = {field.name for field in dataclasses.fields(self.processor.CleanOptions)}
+        unknown = set(fields) - known
+        if unknown:
+            raise ValueError(f"unknown options: {', '.join(sorted(unknown))}")
+        fixed = set(fields) & set(FIXED_OPTIONS)
+        if fixed:
+            raise ValueError(f"set when the daemon starts, not per job: {', '.join(sorted(fixed))}")
+        return self.processor.CleanOptions(**fields, rules_path=self.rules_path)
+
+    def _folder_lock(self, path: str) -> threading.Lock:
+        path = os.path.abspath(path)
+        folder = path if os.path.isdir(path) else os.path.dirname(path)
+        with self._jobs_lock:
+            return self._folder_locks.setdefault(folder, threading.Lock())
+
+    def _run(self, job: _Job):
+        request, send = job.request, job.connection.send
+        on_progress = None
+        if request.get('progress'):
+            on_progress = lambda event: send(_message('progress', **job.tags, **dataclasses.asdict(event)))
+        try:
+            with self._folder_lock(request['path']):
+                if job.cancel_token.cancelled:
+                    raise Cancelled()
+                send(_message('started', **job.tags))
+                result = cli.clean_path(request['path'], bool(request.get('report')), request['options'],
+                                        workers=request.get('workers', 1),
+                                        dedup_across_files=bool(request.get('dedup_across_files')),
+                                        incremental=bool(request.get('incremental')),
+                                        on_progress=on_progress, cancel_token=job.cancel_token)
+            send(_message('done', **job.tags, **result))
+        except Cancelled:
+            send(_message('cancelled', **job.tags))
+        except Exception as e:
+            send(_message('error', **job.tags, message=f"{type(e).__name__}: {e}"))
+        finally:
+            with self._jobs_lock:
+                self._jobs.pop(job.number, None)
+            job.connection.jobs.discard(job)
+            self._slots.release()
+
+
+def request(message: dict, port: int = DEFAULT_PORT, on_event=None, timeout: float = None,
+            token: str = None) -> dict:
+    """
+    Sends one request to a daemon on this machine and returns its last
+    reply: the job's "done", "cancelled", "error" or "busy", or the answer
+    to a command. Every other reply goes to `on_event`. The token is read
+    from token_path() unless given.
+    """
+    final = ('done', 'cancelled', 'error', 'busy', 'pong', 'cancelling', 'stopping')
+    message = {**message, 'token': token or read_token(port)}
+    with socket.create_connection(('127.0.0.1', port), timeout=timeout) as sock:
+        sock.sendall((json.dumps(message) + '\n').encode('utf-8'))
+        with sock.makefile('r', encoding='utf-8') as replies:
+            for line in replies:
+                reply = json.loads(line)
+                if reply['event'] in final:
+                    return reply
+                if on_event is not None:
+                    on_event(reply)
+    raise ConnectionError('the daemon closed the connection')
+
+
+def submit(path: str, report: bool = False, port: int = DEFAULT_PORT, on_event=None, token: str = None,
+           **options) -> dict:
+    """Cleans `path` on a running daemon; `options` are CleanOptions fields."""
+    return request({'path': os.path.abspath(path), 'report': report, 'progress': on_event is not None,
+                    'options': options}, port, on_event, token=token)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='tal-cleaner-daemon', description='Keep the TAL cleaner loaded.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help='run the daemon')
+    serve.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='jobs cleaned at the same time')
+    serve.add_argument('--max-queued', type=int, default=DEFAULT_MAX_QUEUED,
+                       help='jobs waiting for a worker before new ones are refused')
+    serve.add_argument('--rules', metavar='FILE', help='rules file for every job (see cleaner/rules.py)')
+    submit_parser = commands.add_parser('submit', help='clean a file or folder on the daemon')
+    submit_parser.add_argument('path')
+    submit_parser.add_argument('--report', action='store_true', help='also save tal_info.xlsx')
+    commands.add_parser('stop', help='stop the daemon')
+    for command in (serve, submit_parser, commands.choices['stop']):
+        command.add_argument('--port', type=int, default=DEFAULT_PORT)
+        command.add_argument('--token-file', metavar='FILE', help='where the token is kept (default: ~/.tal_cleaner)')
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == 'serve':
+        daemon = CleanerDaemon(args.port, args.workers, args.max_queued, args.rules, args.token_file)
+        print(f"Listening on 127.0.0.1:{daemon.address[1]}", file=sys.stderr, flush=True)
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return cli.EXIT_OK
+    token = read_token(args.port, args.token_file)
+    if args.command == 'stop':
+        request({'command': 'shutdown'}, args.port, token=token)
+        return cli.EXIT_OK
+
+    reply = submit(args.path, args.report, args.port, token=token)
+    print(json.dumps(reply, indent=2))
+    return cli.EXIT_OK if reply['event'] == 'done' and not reply['failed'] else cli.EXIT_FAILED
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,13 @@
 # main.py
-import ui
+import multiprocessing
+import sys
 
 if __name__ == "__main__":
+    # Needed for the bulk-clean worker pool in the PyInstaller build.
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1:
+        # Arguments mean a headless run; the UI (and tkinter) is never loaded.
+        import cli
+        sys.exit(cli.main())
+    import ui
     ui.main()
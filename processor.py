@@ -1,150 +1,1037 @@
 # processor.py
+import collections
+import contextlib
+import dataclasses
+import io
+import itertools
+import multiprocessing
 import os
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
 
 from cleaner import detect
 from cleaner import clean_names
 from cleaner import clean_domains
-from cleaner.utils import save_clean_file, _is_likely_domain, format_tal_info_sheet
+from cleaner import readers
+from cleaner import dedup
+from cleaner.cache import DEFAULT_MAX_ENTRIES, CleanCache
+from cleaner import manifest
+from cleaner import near_duplicates
+from cleaner import rules
+from cleaner.profiling import NULL_PROFILER, StageProfiler, StageTiming, tracing_memory
+from cleaner.progress import Cancelled, ProgressTracker
+from cleaner.utils import ARROW_STRING, open_clean_file, save_clean_file, _is_likely_domain, write_tal_info_workbook
 
-VALUES_TO_REMOVE = {
-    'company', 'account', 'account name', 'name', 'organization', 'customer', 
-    'prospect', 'client', 'domain', 'company domain', 'website', 'url', 
-    'website url', 'web address'
-}
+# The built-in placeholder values (see cleaner/rules.py; a rules file can extend them).
+VALUES_TO_REMOVE = rules.DEFAULT_VALUES_TO_REMOVE
 
-# Global DataFrame to track TAL info
 tal_info_columns = ['file_name', 'type', 'original_rows', 'cleaned_rows']
-tal_info_df = pd.DataFrame(columns=tal_info_columns)
+# Report headers of the record fields, the optional ones included.
+REPORT_HEADERS = {
+    'file_name': 'File Name', 'type': 'Type', 'original_rows': 'Original Rows', 'cleaned_rows': 'Cleaned Rows',
+    'near_duplicates': 'Near Duplicates', 'already_seen': 'Already Seen', 'error': 'Error',
+}
 
-def _process_dataframe(df, file_path, make_new_folder, generate_report, sheet_name=None):
-    """A helper function to run the cleaning process on a single DataFrame."""
-    global tal_info_df
+# Units parsed ahead of the cleaner, and cleaned units waiting for the
+# writer, in a serial bulk run (see _process_files_pipelined).
+PIPELINE_DEPTH = 2
 
-    if df.empty:
-        print(f"Skipping empty sheet/file: {sheet_name or os.path.basename(file_path)}")
-        return
+# Rows read to decide the header and target column before the full read.
+SNIFF_ROWS = 10_000
 
-    main_col, col_type = detect.find_target_column_and_type(df)
-    
-    if main_col is None or main_col not in df.columns:
-        print(f"Could not find a valid data column in {sheet_name or os.path.basename(file_path)}. Skipping.")
-        return
+# CSVs bigger than this are cleaned in chunks unless told otherwise.
+CSV_STREAMING_BYTES = 512 * 1024 * 1024
+DEFAULT_CSV_CHUNKSIZE = 250_000
+# CSVs smaller than this are never split into shards (see CleanOptions.csv_shards).
+SHARD_MIN_BYTES = 64 * 1024 * 1024
 
+# Worker processes are spawned, as on Windows, rather than forked: a fork
+# copies locks held by the caller's other threads (the UI's, the daemon's
+# or the pipeline's) and can deadlock in them.
+_POOL_CONTEXT = multiprocessing.get_context('spawn')
+
+@dataclass
+class CleanOptions:
+    """Per-file cleaning options. Passed as-is to worker processes."""
+    # Rows per chunk when streaming CSVs. None streams files larger than
+    # CSV_STREAMING_BYTES in DEFAULT_CSV_CHUNKSIZE chunks; 0 never streams.
+    csv_chunksize: int = None
+    # Time the read/detect/clean/dedup/write stages of every file and sheet;
+    # profile_memory also records each stage's peak memory (slower, and a
+    # serial bulk run then doesn't overlap reading, cleaning and writing).
+    profile: bool = False
+    profile_memory: bool = False
+    # Collapse near-duplicate names ('Acme Widget' / 'Acme Widgets') after
+    # cleaning; the merges are written next to the cleaned file.
+    merge_near_duplicates: bool = False
+    near_duplicate_threshold: float = near_duplicates.THRESHOLD
+    # SQLite file that keeps raw -> clean values across runs; None disables it.
+    cache_path: str = None
+    cache_max_entries: int = DEFAULT_MAX_ENTRIES
+    # Format of the cleaned files: 'csv', 'parquet', 'arrow' or 'xlsx'
+    # (see cleaner.sinks; Parquet and Arrow need pyarrow).
+    output_format: str = 'csv'
+    # Carry the target column as compact Arrow-backed strings from read to
+    # write (see cleaner.utils.ARROW_STRING; needs pyarrow). Dedup then runs
+    # in pyarrow.
+    arrow_strings: bool = False
+    # JSON file extending or replacing the suffix, special-case, placeholder
+    # and keyword tables (see cleaner/rules.py); None uses the built-in ones.
+    rules_path: str = None
+    # Split a CSV of at least SHARD_MIN_BYTES into this many byte ranges and
+    # clean them in parallel processes (see _process_csv_sharded). The
+    # output is the same as cleaning it in one process. 0 or 1 never splits.
+    csv_shards: int = 0
+
+def _drop_placeholder_values(df, main_col):
+    """Drops missing values and header-like placeholders ('company', 'url', ...)."""
     if pd.api.types.is_string_dtype(df[main_col]):
         valid_strings = df[main_col].dropna()
-        mask = ~valid_strings.str.strip().str.lower().isin(VALUES_TO_REMOVE)
+        mask = ~valid_strings.str.strip().str.lower().isin(rules.active_rules().values_to_remove)
         df = df.loc[mask.index]
+    return df
 
-    original_row_count = df[main_col].notna().sum()
-
+def _clean_column(series, col_type, cache=None):
     if col_type == 'domain':
-        df[main_col] = clean_domains.clean_company_domains(df[main_col])
+        return clean_domains.clean_company_domains(series, cache)
+    return clean_names.clean_company_names(series, cache)
+
+def _first_occurrence_mask(cleaned, seen=None):
+    """
+    Marks the rows to keep: non-missing values not seen on an earlier row.
+    `seen` carries the values kept so far across chunks of the same file and
+    is updated in place.
+    """
+    # Codes number the distinct values in order of appearance, so a row holds
+    # the first of its value when its code is above every code before it.
+    # For Arrow-backed strings the hashing runs over the Arrow buffer.
+    codes, uniques = pd.factorize(cleaned)
+    highest = np.maximum.accumulate(codes)
+    keep = np.ones(len(codes), dtype=bool)
+    keep[1:] = highest[1:] > highest[:-1]
+    keep &= codes >= 0
+    if seen is not None and len(uniques):
+        new = np.fromiter((value not in seen for value in uniques), dtype=bool, count=len(uniques))
+        keep &= new[codes]
+        seen.update(uniques[new])
+    return pd.Series(keep, index=cleaned.index)
+
+def _report_name(file_path, sheet_name=None):
+    return f"{os.path.basename(file_path)} ({sheet_name})" if sheet_name else os.path.basename(file_path)
+
+def _skip_message(file_path, sheet_name=None, empty=True):
+    label = sheet_name or os.path.basename(file_path)
+    if empty:
+        print(f"Skipping empty sheet/file: {label}")
     else:
-        df[main_col] = clean_names.clean_company_names(df[main_col])
+        print(f"Could not find a valid data column in {label}. Skipping.")
 
-    is_not_duplicate = ~df[main_col].duplicated(keep='first')
-    df[main_col] = df[main_col].where(is_not_duplicate, pd.NA)
-    df.dropna(subset=[main_col], inplace=True)
-    
-    output_df = df[[main_col]]
-    
-    save_clean_file(file_path, output_df, col_type, make_new_folder=make_new_folder, sheet_name=sheet_name)
+def _process_dataframe(df, file_path, make_new_folder, sheet_name=None, target=None, profiler=NULL_PROFILER,
+                       cache=None, output_format='csv'):
+    """
+    A helper function to run the cleaning process on a single DataFrame.
+    `target` is the (column, type) to clean if already known; otherwise it is
+    detected. Returns the tal_info record, or None if nothing was saved.
+    """
+    cleaned = _clean_dataframe(df, file_path, sheet_name, target, profiler, cache)
+    if cleaned is None:
+        return None
+    return _write_output(cleaned, file_path, make_new_folder, sheet_name, profiler, output_format)
+
+def _clean_dataframe(df, file_path, sheet_name=None, target=None, profiler=NULL_PROFILER, cache=None):
+    """
+    The detect, clean and dedup stages of _process_dataframe. Returns
+    (output_df, col_type, original_row_count), or None if there is nothing
+    to save.
+    """
+    if df.empty:
+        _skip_message(file_path, sheet_name)
+        return None
+
+    if target is None:
+        with profiler.stage('detect') as timing:
+            target = detect.find_target_column_and_type(df)
+            timing.rows = len(df)
+    main_col, col_type = target
     
-    # **NEW:** Only append to the report if requested.
-    if generate_report:
-        cleaned_rows_count = len(output_df)
-        report_filename = f"{os.path.basename(file_path)} ({sheet_name})" if sheet_name else os.path.basename(file_path)
-        tal_info_df = append_tal_info(tal_info_df, report_filename, col_type, original_row_count, cleaned_rows_count)
-
-def process_single_file(file_path, generate_report):
-    """Process a single file, handling multiple Excel sheets if they exist."""
-    global tal_info_df
-    tal_info_df = pd.DataFrame(columns=tal_info_columns)
-    header_row = 0
+    if main_col is None or main_col not in df.columns:
+        _skip_message(file_path, sheet_name, empty=False)
+        return None
+
+    with profiler.stage('clean') as timing:
+        df = _drop_placeholder_values(df, main_col)
+        original_row_count = df[main_col].notna().sum()
+        df[main_col] = _clean_column(df[main_col], col_type, cache)
+        timing.rows = len(df)
+
+    with profiler.stage('dedup') as timing:
+        output_df = df.loc[_first_occurrence_mask(df[main_col]), [main_col]]
+        timing.rows = len(df)
+    return output_df, col_type, original_row_count
+
+def _write_output(cleaned, file_path, make_new_folder, sheet_name=None, profiler=NULL_PROFILER, output_format='csv'):
+    """The write stage: saves what _clean_dataframe returned and returns its tal_info record."""
+    output_df, col_type, original_row_count = cleaned
+    with profiler.stage('write') as timing:
+        save_path = save_clean_file(file_path, output_df, col_type, make_new_folder=make_new_folder,
+                                    sheet_name=sheet_name, fmt=output_format)
+        timing.rows = len(output_df)
     
+    return {
+        'file_name': _report_name(file_path, sheet_name),
+        'type': col_type,
+        'original_rows': int(original_row_count),
+        'cleaned_rows': len(output_df),
+        'output_path': save_path
+    }
+
+def _sniff_target(read_sample):
+    """
+    Settles the header and target column on a bounded sample of rows.
+    `read_sample(header)` returns the sample parsed with header=0 or None.
+    Returns (header, column_position, col_type); column_position is None if
+    the sample is empty or no usable column was found.
+    """
+    sample = read_sample(0)
+    if sample.empty:
+        return 0, None, None
+    main_col, col_type = detect.find_target_column_and_type(sample)
+    if main_col is None or main_col not in sample.columns:
+        return 0, None, None
+
+    header = 0
+    if not detect.has_header_row(sample.columns, main_col, col_type):
+        header = None
+        sample = read_sample(None)
+        main_col, col_type = detect.find_target_column_and_type(sample)
+    return header, sample.columns.get_loc(main_col), col_type
+
+def _process_csv_stream(file_path, make_new_folder, chunksize, read_kwargs, col_type, tracker=None,
+                        profiler=NULL_PROFILER, cache=None, output_format='csv'):
+    """
+    Cleans one column of a CSV chunk by chunk with flat memory use.
+    Duplicates are dropped across the whole file and each chunk's output is
+    written to the output sink, giving the same file and counts as cleaning
+    the whole column at once. Progress is reported and cancellation checked
+    after every chunk; a failed or cancelled run leaves no partial output.
+    """
+    sink = None
+    seen = set()
+    original_row_count = cleaned_row_count = 0
+
+    with open(file_path, 'rb') as f, pd.read_csv(f, chunksize=chunksize, **read_kwargs) as chunks:
+        position = 0
+        try:
+            while True:
+                with profiler.stage('read') as timing:
+                    chunk = next(chunks, None)
+                    timing.rows = 0 if chunk is None else len(chunk)
+                if chunk is None:
+                    break
+                main_col = chunk.columns[0]
+                with profiler.stage('clean') as timing:
+                    chunk = _drop_placeholder_values(chunk, main_col)
+                    chunk_rows = chunk[main_col].notna().sum()
+                    original_row_count += chunk_rows
+                    cleaned = _clean_column(chunk[main_col], col_type, cache)
+                    timing.rows = len(chunk)
+
+                with profiler.stage('dedup') as timing:
+                    output_df = cleaned[_first_occurrence_mask(cleaned, seen)].to_frame()
+                    timing.rows = len(cleaned)
+                with profiler.stage('write') as timing:
+                    if sink is None:
+                        sink = open_clean_file(file_path, col_type, make_new_folder=make_new_folder,
+                                               fmt=output_format)
+                    sink.write(output_df)
+                    cleaned_row_count += len(output_df)
+                    timing.rows = len(output_df)
+
+                if tracker is not None:
+                    tracker.update('chunk', os.path.basename(file_path), rows=chunk_rows,
+                                   bytes_done=f.tell() - position)
+                    position = f.tell()
+                    tracker.check_cancelled()
+        except BaseException:
+            if sink is not None:
+                sink.abort()
+            raise
+
+    if sink is None:
+        _skip_message(file_path)
+        return None
+    with profiler.stage('write'):
+        sink.close()
+    print(f"Saved cleaned file: {sink.path}")
+    return {
+        'file_name': _report_name(file_path),
+        'type': col_type,
+        'original_rows': int(original_row_count),
+        'cleaned_rows': cleaned_row_count,
+        'output_path': sink.path
+    }
+
+def _list_units(file_path):
+    """
+    Splits a file into independent units of work: one per Excel sheet, or the
+    whole file for a CSV. Each unit is (file_path, sheet_name, multi_sheet).
+    """
     if file_path.endswith(('.xls', '.xlsx')):
+        sheet_names = readers.excel_sheet_names(file_path)
+        return [(file_path, sheet_name, len(sheet_names) > 1) for sheet_name in sheet_names]
+    return [(file_path, None, False)]
+
+def _process_sheet(rows, file_path, make_new_folder, sheet_name=None, profiler=NULL_PROFILER, cache=None,
+                   output_format='csv', arrow_strings=False):
+    """Cleans one sheet from its lazy row iterator."""
+    loaded = _read_sheet(rows, file_path, sheet_name, profiler, arrow_strings)
+    if loaded is None:
+        return None
+    df, target = loaded
+    return _process_dataframe(df, file_path, make_new_folder, sheet_name=sheet_name, target=target, profiler=profiler,
+                              cache=cache, output_format=output_format)
+
+def _read_sheet(rows, file_path, sheet_name=None, profiler=NULL_PROFILER, arrow_strings=False):
+    """
+    Reads one sheet from its lazy row iterator. The header and target column
+    are settled on the first SNIFF_ROWS rows; after that only the target
+    column's cells are kept, as ARROW_STRING values with arrow_strings.
+    Returns (df, target) for _process_dataframe, or None if the sheet has no
+    usable column.
+    """
+    with profiler.stage('read'):
+        sample_rows = list(itertools.islice(rows, SNIFF_ROWS + 1))
+        sample = readers.trim_rows(sample_rows)
+    with profiler.stage('detect') as timing:
+        header, position, col_type = _sniff_target(lambda header: readers.frame_from_rows(sample, header))
+        timing.rows = len(sample)
+    if position is None:
+        _skip_message(file_path, sheet_name, empty=not sample)
+        return None
+
+    with profiler.stage('read') as timing:
+        column = readers.trim_rows(
+            [row[position] if position < len(row) else '']
+            for row in itertools.chain(sample_rows, rows)
+        )
+        df = readers.frame_from_rows(column, header)
+        if arrow_strings and not df.empty:
+            df[df.columns[0]] = df[df.columns[0]].astype(ARROW_STRING)
+        timing.rows = len(df)
+    return df, (df.columns[0], col_type) if not df.empty else None
+
+def _process_csv(file_path, make_new_folder, options, tracker=None, profiler=NULL_PROFILER, cache=None):
+    """
+    Cleans a CSV. The header and target column are settled on a sample, then
+    only that column is read, in chunks if the file is big or streaming is forced.
+    """
+    plan = _plan_csv(file_path, options, profiler)
+    if plan is None:
+        return None
+    return _process_planned_csv(file_path, make_new_folder, plan, options, tracker, profiler, cache)
+
+def _process_planned_csv(file_path, make_new_folder, plan, options, tracker=None, profiler=NULL_PROFILER, cache=None):
+    """Cleans a CSV whose plan is settled: in shards, in chunks or in one go."""
+    read_kwargs, col_type, chunksize = plan
+    if _wants_shards(file_path, options):
+        try:
+            return _process_csv_sharded(file_path, make_new_folder, plan, options, tracker, profiler)
+        except _ShardsFailed as e:
+            print(f"Could not clean {os.path.basename(file_path)} in shards ({e}); cleaning it in one process.")
+    if chunksize:
+        return _process_csv_stream(file_path, make_new_folder, chunksize, read_kwargs, col_type, tracker, profiler,
+                                   cache, options.output_format)
+
+    df, target = _read_csv_column(file_path, read_kwargs, col_type, profiler)
+    return _process_dataframe(df, file_path, make_new_folder, target=target, profiler=profiler,
+                              cache=cache, output_format=options.output_format)
+
+def _plan_csv(file_path, options, profiler=NULL_PROFILER):
+    """
+    Settles a CSV's header and target column on a sample. Returns
+    (read_kwargs, col_type, chunksize), chunksize being 0 unless the file is
+    to be streamed, or None if there is no usable column.
+    """
+    sample_sizes = []
+    def read_sample(header):
+        sample = pd.read_csv(file_path, header=header, nrows=SNIFF_ROWS, encoding='utf-8-sig')
+        sample_sizes.append(len(sample))
+        return sample
+
+    with profiler.stage('detect') as timing:
+        header, position, col_type = _sniff_target(read_sample)
+        timing.rows = sample_sizes[-1]
+    if position is None:
+        _skip_message(file_path, empty=read_sample(0).empty)
+        return None
+    # The column is read as text, so its values don't depend on the rest of
+    # the column (or, streamed, of the chunk) looking like numbers.
+    read_kwargs = {'header': header, 'usecols': [position], 'encoding': 'utf-8-sig',
+                   'dtype': ARROW_STRING if options.arrow_strings else str}
+
+    chunksize = options.csv_chunksize
+    if chunksize is None:
+        chunksize = DEFAULT_CSV_CHUNKSIZE if os.path.getsize(file_path) > CSV_STREAMING_BYTES else 0
+    return read_kwargs, col_type, chunksize
+
+def _read_csv_column(file_path, read_kwargs, col_type, profiler=NULL_PROFILER):
+    """Reads a CSV's target column in one go. Returns (df, target) for _process_dataframe."""
+    with profiler.stage('read') as timing:
+        df = pd.read_csv(file_path, **read_kwargs)
+        timing.rows = len(df)
+    return df, (df.columns[0], col_type) if not df.empty else None
+
+class _ShardsFailed(Exception):
+    """A CSV couldn't be cleaned in shards; it is cleaned in one process instead."""
+
+class _ByteRange(io.RawIOBase):
+    """The next `length` bytes of a binary file, as a file of their own."""
+
+    def __init__(self, f, length):
+        self._f = f
+        self._left = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._f.read(min(len(buffer), self._left))
+        buffer[:len(data)] = data
+        self._left -= len(data)
+        return len(data)
+
+def _wants_shards(file_path, options):
+    return bool(options.csv_shards and options.csv_shards > 1 and os.path.getsize(file_path) >= SHARD_MIN_BYTES)
+
+def _shard_offsets(file_path, shards):
+    """
+    Byte offsets cutting a CSV into about `shards` equal ranges, each cut
+    right after a newline; the file's size comes last. Only the line at each
+    cut is read.
+    """
+    size = os.path.getsize(file_path)
+    offsets = [0]
+    with open(file_path, 'rb') as f:
+        for i in range(1, shards):
+            f.seek(max(size * i // shards - 1, offsets[-1]))
+            f.readline()
+            if f.tell() >= size:
+                break
+            if f.tell() > offsets[-1]:
+                offsets.append(f.tell())
+    return offsets + [size]
+
+def _clean_csv_shard(file_path, start, end, read_kwargs, col_type, chunksize, options):
+    """
+    Cleans the rows of a CSV between two byte offsets, in chunks of
+    `chunksize` rows or with 0 in one go, like _process_csv would. Returns
+    (rows read, original row count, the first occurrences of the cleaned
+    values in order, or None).
+    """
+    rules.use_rules(options.rules_path)
+    rows = original_row_count = 0
+    seen, kept = set(), []
+    with open(file_path, 'rb') as f, _open_cache(options) as cache:
+        f.seek(start)
+        shard = io.BufferedReader(_ByteRange(f, end - start))
+        chunks = pd.read_csv(shard, chunksize=chunksize, **read_kwargs) if chunksize else [
+            pd.read_csv(shard, **read_kwargs)]
+        for chunk in chunks:
+            main_col = chunk.columns[0]
+            rows += len(chunk)
+            if not chunk[main_col].notna().any():
+                continue
+            chunk = _drop_placeholder_values(chunk, main_col)
+            original_row_count += chunk[main_col].notna().sum()
+            cleaned = _clean_column(chunk[main_col], col_type, cache)
+            kept.append(cleaned[_first_occurrence_mask(cleaned, seen)])
+    return rows, int(original_row_count), pd.concat(kept, ignore_index=True) if kept else None
+
+def _process_csv_sharded(file_path, make_new_folder, plan, options, tracker=None, profiler=NULL_PROFILER):
+    """
+    Cleans a big CSV in options.csv_shards processes. The file is cut into
+    byte ranges at the newlines after equal offsets, so finding the cuts
+    reads a line per cut, not the file. Each process cleans its range and
+    drops the duplicates within it. In file order, those first occurrences
+    include the first occurrence of every value in the file, so dropping the
+    duplicates among them again keeps exactly what cleaning the whole column
+    does. The row counts add up the same way.
+
+    A cut inside a quoted field leaves the range before it ending in an open
+    quote, which pandas rejects. A shard that fails for this or any other
+    reason raises _ShardsFailed, and the caller cleans the file in one
+    process instead, so the output never depends on the cuts. Cancelling
+    waits for the running shards, as in _process_files_in_pool.
+    """
+    read_kwargs, col_type, chunksize = plan
+    offsets = _shard_offsets(file_path, options.csv_shards)
+    if len(offsets) < 3:
+        raise _ShardsFailed('too few lines to split')
+    # Later ranges have no header; they get the first line's field count.
+    field_count = len(pd.read_csv(file_path, header=read_kwargs['header'], nrows=1, encoding='utf-8-sig').columns)
+    later_kwargs = {**read_kwargs, 'header': None, 'names': list(range(field_count)), 'encoding': 'utf-8'}
+
+    ranges = list(zip(offsets[:-1], offsets[1:]))
+    with profiler.stage('clean') as timing, \
+            ProcessPoolExecutor(max_workers=len(ranges), mp_context=_POOL_CONTEXT) as executor:
+        futures = {
+            executor.submit(_clean_csv_shard, file_path, start, end, later_kwargs if start else read_kwargs,
+                            col_type, chunksize, options): end - start
+            for start, end in ranges
+        }
+        not_done = set(futures)
+        try:
+            while not_done:
+                if tracker is not None:
+                    tracker.check_cancelled()
+                done, not_done = wait(not_done, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is not None:
+                        raise _ShardsFailed(future.exception())
+                    if tracker is not None:
+                        tracker.update('chunk', os.path.basename(file_path), rows=future.result()[1],
+                                       bytes_done=futures[future])
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        results = [future.result() for future in futures]
+        rows_read = timing.rows = sum(rows for rows, _, _ in results)
+
+    if not rows_read:
+        _skip_message(file_path)
+        return None
+    with profiler.stage('dedup') as timing:
+        kept = [values for _, _, values in results if values is not None]
+        merged = pd.concat(kept, ignore_index=True) if kept else pd.Series([], dtype=object)
+        output_df = merged[_first_occurrence_mask(merged)].to_frame()
+        timing.rows = len(merged)
+    original_row_count = sum(count for _, count, _ in results)
+    return _write_output((output_df, col_type, original_row_count), file_path, make_new_folder,
+                         profiler=profiler, output_format=options.output_format)
+
+def _process_unit(unit, make_new_folder, options, catch_errors=True, tracker=None):
+    """
+    Reads and cleans one unit of work. Returns a list of tal_info records.
+    With catch_errors, failures become error records so one bad file can't
+    stop a batch.
+    """
+    rules.use_rules(options.rules_path)
+    file_path, sheet_name, multi_sheet = unit
+    report_sheet_name = sheet_name if multi_sheet else None
+    profiler = _new_profiler(options, file_path, report_sheet_name)
+    with tracing_memory(options.profile_memory):
+        try:
+            with _open_cache(options) as cache:
+                if sheet_name is None:
+                    record = _process_csv(file_path, make_new_folder, options, tracker, profiler, cache)
+                else:
+                    with profiler.stage('read'):
+                        workbook = readers.ExcelWorkbook(file_path)
+                    with workbook:
+                        for _, rows in workbook.sheets([sheet_name]):
+                            record = _process_sheet(rows, file_path, make_new_folder, report_sheet_name, profiler,
+                                                    cache, options.output_format, options.arrow_strings)
+        except Cancelled:
+            raise
+        except Exception as e:
+            if not catch_errors:
+                raise
+            return [_error_record(file_path, report_sheet_name, e)]
+        return [_finish_record(record, options, profiler)] if record else []
+
+def _process_file(file_path, make_new_folder, options, catch_errors=True, tracker=None):
+    """
+    Process every sheet of a file in turn and return their tal_info records.
+    A workbook is opened once and its sheets are read one at a time.
+    With a tracker, progress is reported and cancellation checked per sheet
+    (and per chunk for streamed CSVs).
+    """
+    if tracker is not None:
+        tracker.check_cancelled()
+        tracker.begin_file(os.path.getsize(file_path))
+
+    if not file_path.endswith(('.xls', '.xlsx')):
+        records = _process_unit((file_path, None, False), make_new_folder, options, catch_errors, tracker)
+    else:
+        records = []
+        try:
+            with readers.ExcelWorkbook(file_path) as workbook, _open_cache(options) as cache:
+                multi_sheet = len(workbook.sheet_names) > 1
+                sheet_bytes = os.path.getsize(file_path) // len(workbook.sheet_names)
+                for sheet_name, rows in workbook.sheets():
+                    report_sheet_name = sheet_name if multi_sheet else None
+                    profiler = _new_profiler(options, file_path, report_sheet_name)
+                    try:
+                        record = _finish_record(
+                            _process_sheet(rows, file_path, make_new_folder, report_sheet_name, profiler, cache,
+                                           options.output_format, options.arrow_strings),
+                            options, profiler)
+                    except Exception as e:
+                        if not catch_errors:
+                            raise
+                        record = _error_record(file_path, report_sheet_name, e)
+                    if record:
+                        records.append(record)
+                    if tracker is not None:
+                        tracker.update('sheet', os.path.basename(file_path), sheet_name,
+                                       rows=record['original_rows'] if record else 0, bytes_done=sheet_bytes)
+                        tracker.check_cancelled()
+        except Cancelled:
+            raise
+        except Exception as e:
+            if not catch_errors:
+                raise
+            records.append(_error_record(file_path, None, e))
+
+    if tracker is not None:
+        tracker.end_file(os.path.basename(file_path), sum(r['original_rows'] for r in records))
+    return records
+
+def _open_cache(options):
+    """The clean cache for a unit of work, if enabled; a context manager either way."""
+    if options.cache_path is None:
+        return contextlib.nullcontext()
+    return CleanCache(options.cache_path, options.cache_max_entries)
+
+def _new_profiler(options, file_path, sheet_name=None):
+    if not (options.profile or options.profile_memory):
+        return NULL_PROFILER
+    return StageProfiler(_report_name(file_path, sheet_name), memory=options.profile_memory)
+
+def _finish_record(record, options, profiler):
+    """
+    Runs the optional near-duplicate pass on a cleaned file and adds the
+    profiler's stage totals to its tal_info record.
+    """
+    if record and options.merge_near_duplicates and record['type'] == 'name':
+        with profiler.stage('near_dup') as timing:
+            merged = near_duplicates.collapse_clean_file(record['output_path'], options.near_duplicate_threshold)
+            timing.rows = record['cleaned_rows']
+        record['cleaned_rows'] -= merged
+        record['near_duplicates'] = merged
+
+    timings = profiler.timings()
+    if record and timings:
+        record['timings'] = [timing.to_dict() for timing in timings]
+    return record
+
+def _emit_timings(records, on_stage):
+    """Passes the stage totals of finished records to the on_stage hook."""
+    if on_stage is None:
+        return
+    for record in records:
+        for timing in record.get('timings', ()):
+            on_stage(StageTiming(**timing))
+
+def _error_record(file_path, sheet_name, error):
+    name = _report_name(file_path, sheet_name)
+    print(f"Failed to process {name}: {error}")
+    return {'file_name': name, 'type': 'error', 'original_rows': 0, 'cleaned_rows': 0, 'error': str(error)}
+
+def _process_files_in_pool(file_paths, workers, options, tracker=None, on_stage=None):
+    """
+    Cleans files in a process pool. Sheets are submitted as their own units so
+    a big workbook doesn't serialize the run. Returns {file_path: records},
+    each file's records in sheet order, whatever order the workers finish in.
+    Progress and stage timings are reported as units finish. Cancelling drops
+    the units that haven't started and waits for the running ones.
+    """
+    pending = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_POOL_CONTEXT) as executor:
+        for file_path in file_paths:
+            try:
+                units = _list_units(file_path)
+            except Exception as e:
+                pending.append((file_path, None, [_error_record(file_path, None, e)]))
+                continue
+            for unit in units:
+                pending.append((file_path, unit, executor.submit(_process_unit, unit, True, options)))
+
+        if tracker is not None:
+            try:
+                _track_pool(pending, tracker, on_stage)
+            except Cancelled:
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+
+        records = {file_path: [] for file_path in file_paths}
+        for file_path, unit, result in pending:
+            if unit is None:
+                records[file_path].extend(result)
+                continue
+            try:
+                records[file_path].extend(result.result())
+            except Exception as e:
+                # e.g. a worker process that died
+                _, sheet_name, multi_sheet = unit
+                records[file_path].append(_error_record(file_path, sheet_name if multi_sheet else None, e))
+    return records
+
+def _track_pool(pending, tracker, on_stage=None, poll_seconds=0.2):
+    """Reports pool units to the tracker and on_stage as they finish, in any order."""
+    units = {result: unit for _, unit, result in pending if unit is not None}
+    units_per_file = collections.Counter(file_path for file_path, _, _ in units.values())
+    units_left = dict(units_per_file)
+
+    not_done = set(units)
+    while not_done:
+        tracker.check_cancelled()
+        done, not_done = wait(not_done, timeout=poll_seconds, return_when=FIRST_COMPLETED)
+        for result in done:
+            file_path, sheet_name, _ = units[result]
+            records = [] if result.exception() else result.result()
+            rows = sum(r['original_rows'] for r in records)
+            _emit_timings(records, on_stage)
+            units_left[file_path] -= 1
+            tracker.update('sheet' if sheet_name is not None else 'file', os.path.basename(file_path),
+                           sheet_name, rows=rows,
+                           bytes_done=os.path.getsize(file_path) // units_per_file[file_path],
+                           file_done=units_left[file_path] == 0)
+
+@dataclass
+class _PipelineItem:
+    """
+    What moves between the stages of _process_files_pipelined. kind is
+    'begin' or 'end' (of a file), or for a unit: 'frame' (a parsed column to
+    clean), 'stream' (a CSV to clean from its file, in chunks or shards),
+    'skip' or 'error'.
+    """
+    kind: str
+    file_path: str
+    sheet_name: str = None
+    profiler: object = NULL_PROFILER
+    payload: object = None
+    sheet_bytes: int = None  # share of the workbook's size, for progress
+
+
+def _put(items, item, stop):
+    """Puts on a bounded queue, giving up once `stop` is set. Returns whether it was put."""
+    while not stop.is_set():
         try:
-            xls = pd.ExcelFile(file_path)
-            for sheet_name in xls.sheet_names:
-                df = pd.read_excel(file_path, header=header_row, sheet_name=sheet_name)
-                current_sheet_name = sheet_name if len(xls.sheet_names) > 1 else None
-                _process_dataframe(df, file_path, False, generate_report, sheet_name=current_sheet_name)
-        except Exception:
-            xls = pd.ExcelFile(file_path)
-            for sheet_name in xls.sheet_names:
-                df = pd.read_excel(file_path, header=None, sheet_name=sheet_name)
-                current_sheet_name = sheet_name if len(xls.sheet_names) > 1 else None
-                _process_dataframe(df, file_path, False, generate_report, sheet_name=current_sheet_name)
-    else: # It's a CSV
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _read_units(file_path, options):
+    """Parses the sheets (or the CSV) of one file into pipeline items, in order."""
+    if not file_path.endswith(('.xls', '.xlsx')):
+        profiler = _new_profiler(options, file_path)
+        try:
+            plan = _plan_csv(file_path, options, profiler)
+            if plan is None:
+                yield _PipelineItem('skip', file_path)
+            elif plan[2] or _wants_shards(file_path, options):
+                yield _PipelineItem('stream', file_path, profiler=profiler, payload=plan)
+            else:
+                yield _PipelineItem('frame', file_path, profiler=profiler,
+                                    payload=_read_csv_column(file_path, plan[0], plan[1], profiler))
+        except Exception as e:
+            yield _PipelineItem('error', file_path, payload=_error_record(file_path, None, e))
+        return
+
+    try:
+        with readers.ExcelWorkbook(file_path) as workbook:
+            multi_sheet = len(workbook.sheet_names) > 1
+            sheet_bytes = os.path.getsize(file_path) // len(workbook.sheet_names)
+            for sheet_name, rows in workbook.sheets():
+                report_sheet_name = sheet_name if multi_sheet else None
+                profiler = _new_profiler(options, file_path, report_sheet_name)
+                try:
+                    loaded = _read_sheet(rows, file_path, report_sheet_name, profiler, options.arrow_strings)
+                    item = _PipelineItem('skip' if loaded is None else 'frame', file_path, report_sheet_name,
+                                         profiler, loaded)
+                except Exception as e:
+                    item = _PipelineItem('error', file_path, report_sheet_name,
+                                         payload=_error_record(file_path, report_sheet_name, e))
+                item.sheet_bytes = sheet_bytes
+                yield item
+    except Exception as e:
+        yield _PipelineItem('error', file_path, payload=_error_record(file_path, None, e))
+
+
+def _reader_stage(file_paths, options, units, stop):
+    """Reader thread: parses the files in order ahead of the cleaner."""
+    for file_path in file_paths:
+        if not _put(units, _PipelineItem('begin', file_path), stop):
+            return
+        for item in _read_units(file_path, options):
+            if not _put(units, item, stop):
+                return
+        if not _put(units, _PipelineItem('end', file_path), stop):
+            return
+    _put(units, None, stop)
+
+
+def _writer_stage(outputs, done, options):
+    """
+    Writer thread: saves the cleaned units in order, runs the per-file passes
+    on them and hands (file_path, record) pairs to `done`.
+    """
+    for item in iter(outputs.get, None):
         try:
-            df = pd.read_csv(file_path, header=header_row, encoding='utf-8-sig')
-            _process_dataframe(df, file_path, False, generate_report)
-        except Exception:
-            df = pd.read_csv(file_path, header=None, encoding='utf-8-sig')
-            _process_dataframe(df, file_path, False, generate_report)
+            if item.kind == 'frame':
+                record = _write_output(item.payload, item.file_path, True, item.sheet_name, item.profiler,
+                                       options.output_format)
+            else:
+                record = item.payload
+            if record and record['type'] != 'error':
+                record = _finish_record(record, options, item.profiler)
+        except Exception as e:
+            record = _error_record(item.file_path, item.sheet_name, e)
+        if record:
+            done.put((item.file_path, record))
+
+
+def _process_files_pipelined(file_paths, options, tracker=None, on_stage=None):
+    """
+    Cleans files one at a time like _process_file, but with reading and
+    writing overlapped: a reader thread parses the next files and sheets, the
+    calling thread cleans them and a writer thread saves the outputs. The
+    stages are connected by queues of PIPELINE_DEPTH units, so at most a few
+    parsed sheets are held in memory. Returns {file_path: records} in file
+    and sheet order. Big CSVs are still streamed chunk by chunk by the cleaning stage.
+    """
+    units, outputs, done = queue.Queue(PIPELINE_DEPTH), queue.Queue(PIPELINE_DEPTH), queue.Queue()
+    stop = threading.Event()
+    reader = threading.Thread(target=_reader_stage, args=(file_paths, options, units, stop), daemon=True)
+    writer = threading.Thread(target=_writer_stage, args=(outputs, done, options), daemon=True)
+    reader.start()
+    writer.start()
+
+    records = {file_path: [] for file_path in file_paths}
+    def collect():
+        while not done.empty():
+            file_path, record = done.get()
+            _emit_timings([record], on_stage)
+            records[file_path].append(record)
+
+    try:
+        with _open_cache(options) as cache:
+            file_rows = 0
+            for item in iter(units.get, None):
+                if item.kind == 'begin':
+                    if tracker is not None:
+                        tracker.check_cancelled()
+                        tracker.begin_file(os.path.getsize(item.file_path))
+                    file_rows = 0
+                    continue
+                if item.kind == 'end':
+                    if tracker is not None:
+                        tracker.end_file(os.path.basename(item.file_path), file_rows)
+                    collect()
+                    continue
+
+                rows = 0
+                try:
+                    if item.kind == 'frame':
+                        df, target = item.payload
+                        item.payload = _clean_dataframe(df, item.file_path, item.sheet_name, target, item.profiler,
+                                                        cache)
+                        if item.payload is None:
+                            item.kind = 'skip'
+                        else:
+                            rows = int(item.payload[2])
+                    elif item.kind == 'stream':
+                        item.payload = _process_planned_csv(item.file_path, True, item.payload, options, tracker,
+                                                            item.profiler, cache)
+                        rows = item.payload['original_rows'] if item.payload else 0
+                except Cancelled:
+                    raise
+                except Exception as e:
+                    item.kind, item.payload = 'error', _error_record(item.file_path, item.sheet_name, e)
+                file_rows += rows
+                if item.kind != 'skip':
+                    outputs.put(item)
+                if tracker is not None and item.sheet_bytes is not None:
+                    tracker.update('sheet', os.path.basename(item.file_path), item.sheet_name, rows=rows,
+                                   bytes_done=item.sheet_bytes)
+                    tracker.check_cancelled()
+    finally:
+        stop.set()
+        outputs.put(None)
+        writer.join()
+        reader.join()
+    collect()
+    return records
+
+
+def _dedup_across_files(records, tracker=None):
+    """
+    Keeps each cleaned value only in the first file or sheet, in report order,
+    that has it. The cleaned files are filtered one at a time against a
+    folder-wide key index; cleaned_rows becomes the rows new to the folder
+    and already_seen counts those dropped.
+    """
+    with dedup.KeyIndex() as index:
+        for record in records:
+            if record['type'] == 'error' or not record.get('output_path'):
+                continue
+            if tracker is not None:
+                tracker.check_cancelled()
+            record['cleaned_rows'], record['already_seen'] = dedup.dedup_clean_file(
+                record['output_path'], record['type'], index)
+
+def _manifest_settings(options):
+    """What a manifest's outputs depend on; csv_chunksize and profiling don't change them."""
+    return {
+        'rules': manifest.rules_version(os.path.abspath(__file__)),
+        'rule_set': rules.active_rules().version,
+        'options': {
+            'merge_near_duplicates': options.merge_near_duplicates,
+            'near_duplicate_threshold': options.near_duplicate_threshold,
+            'output_format': options.output_format,
+            'arrow_strings': options.arrow_strings,
+        },
+    }
+
+
+def _update_manifest(run_manifest, records_by_file):
+    for file_path, file_records in records_by_file.items():
+        sheets = None
+        if file_path.endswith(('.xls', '.xlsx')):
+            try:
+                sheets = readers.excel_sheet_names(file_path)
+            except Exception:
+                pass
+        run_manifest.update(file_path, file_records, sheets)
+    run_manifest.save()
+
+
+def _report_value(value):
+    """Plain Python values for the report; numpy scalars are unwrapped."""
+    return value.item() if isinstance(value, np.generic) else value
+
+def _write_tal_info(records, tal_info_path):
+    """Save the tal_info records as a formatted Excel report, in one pass."""
+    columns = tal_info_columns + [
+        column for column in ('near_duplicates', 'already_seen', 'error') if any(column in r for r in records)
+    ]
+    rows = [[_report_value(record.get(column)) for column in columns] for record in records]
+    sheets = [('Sheet1', [REPORT_HEADERS[column] for column in columns], rows)]
+
+    timings = [timing for record in records for timing in record.get('timings', ())]
+    if timings:
+        sheets.append(('Timings', *_timings_rows(timings)))
+    write_tal_info_workbook(tal_info_path, sheets)
+    print(f"TAL info saved to {tal_info_path}")
+
+def _timings_rows(timings):
+    """Header and rows of the 'Timings' sheet: one row per file/sheet and stage."""
+    with_memory = any(timing['peak_mib'] is not None for timing in timings)
+    header = ['File Name', 'Stage', 'Seconds', 'Rows', 'Rows/s'] + (['Peak MiB'] if with_memory else [])
+    rows = []
+    for timing in timings:
+        seconds = timing['seconds']
+        row = [timing['file_name'], timing['stage'], round(seconds, 4), timing['rows'],
+               round(timing['rows'] / seconds) if seconds > 0 else None]
+        if with_memory:
+            row.append(None if timing['peak_mib'] is None else round(timing['peak_mib'], 2))
+        rows.append(row)
+    return header, rows
+
+def _profiled(options, on_stage):
+    """
+    The options to run with: an on_stage hook turns profiling on. Also makes
+    their rules file the active rule set of this process.
+    """
+    options = options or CleanOptions()
+    if on_stage is not None and not (options.profile or options.profile_memory):
+        options = dataclasses.replace(options, profile=True)
+    rules.use_rules(options.rules_path)
+    return options
+
+def process_single_file(file_path, generate_report, options=None, on_progress=None, cancel_token=None,
+                        on_stage=None):
+    """
+    Process a single file, handling multiple Excel sheets if they exist.
+    Returns the tal_info records whether or not the report is saved.
+    `on_progress` receives a ProgressEvent after each chunk, sheet and file;
+    setting `cancel_token` stops the run with Cancelled. `on_stage` receives
+    a StageTiming per stage of every file and sheet (see CleanOptions.profile),
+    which also go to a 'Timings' sheet of the report.
+    """
+    options = _profiled(options, on_stage)
+    tracker = ProgressTracker(on_progress, cancel_token)
+    tracker.start(os.path.getsize(file_path), 1)
+    with tracing_memory(options.profile_memory):
+        records = _process_file(file_path, False, options, catch_errors=False, tracker=tracker)
+    _emit_timings(records, on_stage)
+    tracker.finish()
 
     # **NEW:** Only save and format the report if requested.
     if generate_report:
-        tal_info_df.rename(columns={
-            'file_name': 'File Name', 'type': 'Type',
-            'original_rows': 'Original Rows', 'cleaned_rows': 'Cleaned Rows'
-        }, inplace=True)
         tal_info_path = os.path.join(os.path.dirname(file_path), 'tal_info.xlsx')
-        tal_info_df.to_excel(tal_info_path, index=False)
-        format_tal_info_sheet(tal_info_path)
-        print(f"TAL info saved to {tal_info_path}")
+        _write_tal_info(records, tal_info_path)
+    return records
 
-def process_folder(folder_path, generate_report):
-    """Process all files in a folder, handling multiple Excel sheets."""
-    global tal_info_df
-    tal_info_df = pd.DataFrame(columns=tal_info_columns)
+def process_folder(folder_path, generate_report, workers=1, options=None, on_progress=None, cancel_token=None,
+                   on_stage=None, dedup_across_files=False, incremental=False):
+    """
+    Process all files in a folder, handling multiple Excel sheets.
+    With workers > 1, files and sheets are cleaned in parallel processes.
+    Files are handled in name order and the report keeps that order.
+    Returns the tal_info records whether or not the report is saved.
+    Progress, cancellation and stage timings work as in process_single_file;
+    in parallel runs progress is per sheet/file rather than per chunk.
+    With dedup_across_files, a value is only kept in the first file or sheet
+    that has it, and the report gains an 'Already Seen' column.
+    With incremental, only new or changed files are cleaned; the others reuse
+    the records in clean_companies/manifest.json, and the outputs of files
+    that are gone are deleted. Folder-wide dedup rewrites every output, so it
+    always makes a full run.
+    """
+    options = _profiled(options, on_stage)
+    clean_folder_path = os.path.join(folder_path, 'clean_companies')
+    file_paths = [
+        os.path.join(folder_path, filename) for filename in sorted(os.listdir(folder_path))
+        if filename.endswith(('.csv', '.xls', '.xlsx'))
+    ]
 
-    for filename in os.listdir(folder_path):
-        if filename.endswith(('.csv', '.xls', '.xlsx')):
-            file_path = os.path.join(folder_path, filename)
-            header_row = 0
+    # Skip the files the manifest says are unchanged. Any other run
+    # rewrites the outputs behind the manifest's back, so it is dropped.
+    run_manifest, cached = None, {}
+    if incremental and not dedup_across_files:
+        run_manifest = manifest.Manifest(clean_folder_path, _manifest_settings(options))
+        run_manifest.remove_missing(file_paths)
+        cached = {file_path: run_manifest.cached_records(file_path) for file_path in file_paths}
+    else:
+        manifest.discard(clean_folder_path)
+    changed_paths = [file_path for file_path in file_paths if cached.get(file_path) is None]
+
+    tracker = ProgressTracker(on_progress, cancel_token)
+    tracker.start(sum(os.path.getsize(file_path) for file_path in changed_paths), len(changed_paths))
+
+    if workers and workers > 1:
+        fresh = _process_files_in_pool(changed_paths, workers, options, tracker, on_stage)
+    elif options.profile_memory:
+        # The pipeline's threads would overlap stages and mix up their
+        # memory peaks, so the files are cleaned one stage at a time.
+        fresh = {}
+        with tracing_memory():
+            for file_path in changed_paths:
+                fresh[file_path] = _process_file(file_path, True, options, tracker=tracker)
+                _emit_timings(fresh[file_path], on_stage)
+    else:
+        fresh = _process_files_pipelined(changed_paths, options, tracker, on_stage)
+    if run_manifest is not None:
+        _update_manifest(run_manifest, fresh)
+    records = [record for file_path in file_paths
+               for record in (fresh[file_path] if file_path in fresh else cached[file_path])]
+    if dedup_across_files:
+        _dedup_across_files(records, tracker)
+    tracker.finish()
 
-            if filename.endswith(('.xls', '.xlsx')):
-                try:
-                    xls = pd.ExcelFile(file_path)
-                    for sheet_name in xls.sheet_names:
-                        df = pd.read_excel(file_path, header=header_row, sheet_name=sheet_name)
-                        current_sheet_name = sheet_name if len(xls.sheet_names) > 1 else None
-                        _process_dataframe(df, file_path, True, generate_report, sheet_name=current_sheet_name)
-                except Exception:
-                    xls = pd.ExcelFile(file_path)
-                    for sheet_name in xls.sheet_names:
-                        df = pd.read_excel(file_path, header=None, sheet_name=sheet_name)
-                        current_sheet_name = sheet_name if len(xls.sheet_names) > 1 else None
-                        _process_dataframe(df, file_path, True, generate_report, sheet_name=current_sheet_name)
-            else: # It's a CSV
-                try:
-                    df = pd.read_csv(file_path, header=header_row, encoding='utf-8-sig')
-                    _process_dataframe(df, file_path, True, generate_report)
-                except Exception:
-                    df = pd.read_csv(file_path, header=None, encoding='utf-8-sig')
-                    _process_dataframe(df, file_path, True, generate_report)
-                    
     # **NEW:** Only save and format the report if requested.
     if generate_report:
-        tal_info_df.rename(columns={
-            'file_name': 'File Name', 'type': 'Type',
-            'original_rows': 'Original Rows', 'cleaned_rows': 'Cleaned Rows'
-        }, inplace=True)
-        clean_folder_path = os.path.join(folder_path, 'clean_companies')
         os.makedirs(clean_folder_path, exist_ok=True)
         tal_info_path = os.path.join(clean_folder_path, 'tal_info.xlsx')
-        tal_info_df.to_excel(tal_info_path, index=False)
-        format_tal_info_sheet(tal_info_path)
-        print(f"TAL info saved to {tal_info_path}")
-
-def append_tal_info(tal_info_df, file_name, col_type, original_rows, cleaned_rows):
-    """Add a row to the TAL info DataFrame."""
-    new_row = {
-        'file_name': file_name,
-        'type': col_type,
-        'original_rows': original_rows,
-        'cleaned_rows': cleaned_rows
-    }
-    return pd.concat([tal_info_df, pd.DataFrame([new_row])], ignore_index=True)
\ No newline at end of file
+        _write_tal_info(records, tal_info_path)
+    return records
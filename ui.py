@@ -1,8 +1,11 @@
 # ui.py
+import os
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import processor
+import importlib
+import queue
 import threading
+from cleaner.progress import CancelToken, Cancelled
 
 # Colors & styles
 BG_COLOR = "#f0f4f8"
@@ -17,6 +20,11 @@ FONT_INSTRUCTIONS = ("Helvetica", 11)
 # Track last mode clicked: 'single' or 'bulk'
 last_mode = None
 
+# Progress events from the processing thread, drained on the Tk thread.
+progress_events = queue.Queue()
+PROGRESS_POLL_MS = 100
+cancel_token = None
+
 def run_in_thread(func, *args):
     """Run a function in a separate thread to avoid freezing the UI."""
     threading.Thread(target=func, args=args, daemon=True).start()
@@ -29,10 +37,11 @@ def single_clean():
 def bulk_clean():
     global last_mode
     last_mode = 'bulk'
-    select_file_or_folder(mode="bulk", generate_report=report_var.get())
+    select_file_or_folder(mode="bulk", generate_report=report_var.get(), dedup_across_files=dedup_var.get())
 
-def select_file_or_folder(mode, generate_report):
+def select_file_or_folder(mode, generate_report, dedup_across_files=False):
     """Prompt the user to select a file or folder, then start processing."""
+    global cancel_token
     if mode == "single":
         path = filedialog.askopenfilename(
             title="Select a CSV or Excel file",
@@ -42,34 +51,77 @@ def select_file_or_folder(mode, generate_report):
         path = filedialog.askdirectory(title="Select a folder with TAL files")
 
     if path:
+        cancel_token = CancelToken()
         # Show progress bar
         show_progress_bar()
-        run_in_thread(process_file_wrapper, path, mode, generate_report)
+        run_in_thread(process_file_wrapper, path, mode, generate_report, dedup_across_files)
 
 def show_progress_bar():
-    """Add progress bar to the main window if it doesn't exist yet."""
-    global progress
+    """Add progress bar, status line and Cancel button to the main window."""
     if not hasattr(root, 'progress'):
-        root.progress = ttk.Progressbar(root, orient="horizontal", length=300, mode="indeterminate")
-        root.progress.pack(pady=(10, 20))
-    root.progress.start()
+        root.progress = ttk.Progressbar(root, orient="horizontal", length=300, mode="determinate", maximum=100)
+        root.progress.pack(pady=(10, 5))
+        root.progress_label = tk.Label(root, text="Starting...", font=FONT_INSTRUCTIONS, bg=BG_COLOR, fg="#555555")
+        root.progress_label.pack()
+        root.cancel_button = tk.Button(root, text="Cancel", font=FONT_INSTRUCTIONS, command=cancel_run)
+        root.cancel_button.pack(pady=(5, 10))
+    root.progress['value'] = 0
+    while not progress_events.empty():
+        progress_events.get_nowait()
+    root.after(PROGRESS_POLL_MS, poll_progress)
 
 def hide_progress_bar():
     """Stop and hide progress bar safely."""
     if hasattr(root, 'progress') and root.progress.winfo_exists():
-        root.progress.stop()
-        root.progress.pack_forget()
-        root.progress.destroy()
+        for widget in (root.progress, root.progress_label, root.cancel_button):
+            widget.pack_forget()
+            widget.destroy()
         delattr(root, 'progress')
 
-def process_file_wrapper(path, mode, generate_report):
+def cancel_run():
+    """Ask the running job to stop after its current chunk."""
+    if cancel_token is not None:
+        cancel_token.cancel()
+        root.cancel_button.config(state="disabled")
+        root.progress_label.config(text="Cancelling...")
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m {seconds:02d}s"
+
+def poll_progress():
+    """Show the latest progress event. Runs on the Tk thread while the bar exists."""
+    if not hasattr(root, 'progress') or not root.progress.winfo_exists():
+        return
+    event = None
+    while not progress_events.empty():
+        event = progress_events.get_nowait()
+    if event is not None and not cancel_token.cancelled:
+        root.progress['value'] = event.fraction * 100
+        status = f"{event.files_done}/{event.files_total} files · {event.total_rows:,} rows"
+        if event.rows_per_second:
+            status += f" · {event.rows_per_second:,.0f} rows/s"
+        if event.eta_seconds is not None and event.stage != 'done':
+            status += f" · ETA {format_duration(event.eta_seconds)}"
+        root.progress_label.config(text=status)
+    root.after(PROGRESS_POLL_MS, poll_progress)
+
+def process_file_wrapper(path, mode, generate_report, dedup_across_files=False):
     """Wrapper to process files/folders and update the UI when done."""
     try:
+        # Usually already imported in the background by main().
+        import processor
         if mode == "single":
-            processor.process_single_file(path, generate_report)
+            processor.process_single_file(path, generate_report,
+                                          on_progress=progress_events.put, cancel_token=cancel_token)
         else:
-            processor.process_folder(path, generate_report)
+            processor.process_folder(path, generate_report, workers=os.cpu_count(),
+                                     on_progress=progress_events.put, cancel_token=cancel_token,
+                                     dedup_across_files=dedup_across_files)
         root.after(0, post_process_ui)
+    except Cancelled:
+        root.after(0, lambda: messagebox.showinfo("Cancelled", "The run was cancelled."))
     except Exception as e:
         root.after(0, lambda: messagebox.showerror("Error", f"An error occurred:\n{e}"))
     finally:
@@ -156,7 +208,20 @@ def build_main_ui():
         bg=BG_COLOR,
         activebackground=BG_COLOR
     )
-    report_checkbox.pack(pady=(10, 5))
+    report_checkbox.pack(pady=(10, 0))
+
+    # Checkbox for removing duplicates across the files of a bulk clean
+    dedup_checkbox = tk.Checkbutton(
+        root,
+        text="Bulk Clean: keep each company in the first file only",
+        variable=dedup_var,
+        onvalue=True,
+        offvalue=False,
+        font=FONT_INSTRUCTIONS,
+        bg=BG_COLOR,
+        activebackground=BG_COLOR
+    )
+    dedup_checkbox.pack(pady=(0, 5))
 
     # Single Clean Button
     btn_single = tk.Button(
@@ -179,20 +244,24 @@ def build_main_ui():
     btn_bulk.bind("<Leave>", lambda e: btn_bulk.config(bg=BTN_COLOR))
 
 def main():
-    global root, report_var
+    global root, report_var, dedup_var
     root = tk.Tk()
     root.title("TAL Cleaner 🤖")
-    root.geometry("500x380") # Increased height for the checkbox
+    root.geometry("500x470") # Room for the checkboxes and the progress status
     root.configure(bg=BG_COLOR)
     root.resizable(False, False)
     
     # **NEW:** Variable to hold the checkbox state
     report_var = tk.BooleanVar(value=False) # Default is unchecked
+    dedup_var = tk.BooleanVar(value=False)
 
     # Center the window
     root.eval('tk::PlaceWindow . center')
 
     build_main_ui()
+    # Load the processing modules while the user picks a file, so the
+    # window doesn't wait for pandas to import.
+    run_in_thread(importlib.import_module, 'processor')
     root.mainloop()
 
 if __name__ == "__main__":